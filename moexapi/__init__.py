@@ -1,9 +1,80 @@
-from .bonds import *
-from .candles import *
-from .changeover import *
-from .dividends import *
-from .exchange import *
-from .history import *
-from .markets import *
-from .splits import *
-from .tickers import *
+import typing as T
+
+import importlib
+
+
+# submodules are imported on first access of their names, so "import moexapi" loads
+# neither requests nor numpy nor bs4
+_EXPORTS = {
+    "archive": ["CandleArchive"],
+    "backfill": ["BackfillReport", "BackfillUnit", "load_backfill", "plan_backfill", "run_backfill"],
+    "bonds": ["Amortization", "Bond", "Cashflow", "Coupon", "Offer"],
+    "candles": [
+        "Candle", "CandleColumns", "CandlePoller", "CandleUpdate", "get_candles", "get_candles_batch", "resample_candles",
+    ],
+    "changeover": ["Changeover", "get_changeovers", "get_current_ticker", "get_prev_tickers"],
+    "cli": [],
+    "dividends": ["Dividend", "Dividends", "get_dividends"],
+    "exchange": ["get_cbrf_rate", "get_moex_rate", "get_moex_usd_eur_rate", "get_rate"],
+    "gaps": [
+        "Gap", "find_candle_gaps", "find_history_gaps", "repair_candles", "repair_history", "trading_days",
+        "weekday_calendar",
+    ],
+    "history": ["History", "HistoryColumns", "get_history"],
+    "indicators": ["ATR", "EMA", "RSI", "SMA", "VWAP", "Volatility", "atr", "ema", "rsi", "sma", "volatility", "vwap"],
+    "markets": ["Market", "Markets", "get_market"],
+    "portfolio": ["NAV", "Position", "value_portfolio"],
+    "rediscache": ["LocalRedisServer", "RedisCache", "RedisClient", "RedisError"],
+    "risk": ["Returns", "correlation", "covariance", "get_returns"],
+    "screener": ["BondUniverse"],
+    "search": ["SearchIndex", "build_index"],
+    "splits": ["Split", "get_splits", "get_ticker_splits"],
+    "tickers": [
+        "ACCRUEDINT", "BOARDID", "CURRENCY", "CURRENTVALUE", "FACEUNIT", "FACEVALUEONSETTLEDATE", "ISIN", "IS_TRADED",
+        "LAST", "LISTED_TILL", "LISTLEVEL", "LOTVALUE", "PREVPRICE", "SECID", "SECSUBTYPE", "SHORTNAME", "VALTODAY",
+        "LazyTicker", "Listing", "NotFindTicker", "Snapshot", "Ticker", "TickerBoardInfo", "TickerInfo",
+        "get_snapshot", "get_ticker", "get_ticker_info_dict", "get_tickers", "materialize_tickers",
+    ],
+    "universe": ["Universe", "export_universe", "install_universe", "load_universe", "save_universe"],
+    "utils": [],
+}
+_MODULES = {name: module for module, names in _EXPORTS.items() for name in names}
+
+
+def __getattr__(name: str) -> T.Any:
+    if name in _EXPORTS:
+        return importlib.import_module(f".{name}", __name__)
+    if name in _MODULES:
+        value = getattr(importlib.import_module(f".{_MODULES[name]}", __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_EXPORTS) | set(_MODULES))
+
+
+__all__ = sorted(_MODULES)
+
+
+if T.TYPE_CHECKING:
+    from .archive import *
+    from .backfill import *
+    from .bonds import *
+    from .candles import *
+    from .changeover import *
+    from .dividends import *
+    from .exchange import *
+    from .gaps import *
+    from .history import *
+    from .indicators import *
+    from .markets import *
+    from .portfolio import *
+    from .rediscache import *
+    from .risk import *
+    from .screener import *
+    from .search import *
+    from .splits import *
+    from .tickers import *
+    from .universe import *
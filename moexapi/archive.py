@@ -0,0 +1,150 @@
+import typing as T
+
+import datetime
+import json
+import os
+
+import numpy as np
+
+from . import candles
+from . import tickers
+
+
+_META = "meta.json"
+_META_VERSION = 1
+_INDEX = "index.bin"
+# every _INDEX_STEP-th start is kept in index, so a lookup touches the small index and one block of starts
+_INDEX_STEP = 1024
+_DTYPES = {
+    "start": np.dtype("<M8[s]"),
+    "end": np.dtype("<M8[s]"),
+    "low": np.dtype("<f8"),
+    "high": np.dtype("<f8"),
+    "open": np.dtype("<f8"),
+    "close": np.dtype("<f8"),
+    "volume": np.dtype("<f8"),
+    "value": np.dtype("<f8"),
+}
+
+
+class CandleArchive:
+    """
+    Candles stored as one fixed-width file per column and key, e.g. key "SBER/TQBR/1"
+
+    read() returns np.memmap slices, so processes reading one archive share the OS page cache
+    and nothing is copied. Row count lives in meta.json which is replaced after data is written,
+    so readers never see partly appended rows. The last row is replaced in place when it is
+    updated (see append), a concurrent reader may see it with a mix of old and new values.
+    There must be only one writer per key.
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, key: str, name: str) -> str:
+        return os.path.join(self.directory, key, name)
+
+    def keys(self) -> list[str]:
+        result = []
+        for root, _, files in os.walk(self.directory):
+            if _META in files:
+                result.append(os.path.relpath(root, self.directory).replace(os.sep, "/"))
+        return sorted(result)
+
+    def rows(self, key: str) -> int:
+        path = self._path(key, _META)
+        if not os.path.exists(path):
+            return 0
+        with open(path) as f:
+            meta = json.load(f)
+        assert meta["version"] == _META_VERSION, f"Unsupported archive version {meta['version']}"
+        return meta["rows"]
+
+    def _column(self, key: str, name: str, rows: int) -> np.ndarray:
+        if rows == 0:
+            return np.empty(0, dtype=_DTYPES[name])
+        return np.memmap(self._path(key, f"{name}.bin"), dtype=_DTYPES[name], mode="r", shape=(rows,))
+
+    def _position(self, key: str, rows: int, date: np.datetime64, side: str) -> int:
+        if rows == 0:
+            return 0
+        index = np.memmap(self._path(key, _INDEX), dtype=_DTYPES["start"], mode="r", shape=(-(-rows // _INDEX_STEP),))
+        block = max(int(np.searchsorted(index, date, side=side)) - 1, 0)
+        begin = block * _INDEX_STEP
+        # the first start after the block may equal date, so look one row further
+        starts = self._column(key, "start", rows)[begin:begin + _INDEX_STEP + 1]
+        return begin + int(np.searchsorted(starts, date, side=side))
+
+    def read(
+        self,
+        key: str,
+        start_date: T.Optional[T.Union[datetime.datetime, datetime.date]] = None,
+        end_date: T.Optional[T.Union[datetime.datetime, datetime.date]] = None,
+    ) -> candles.CandleColumns:
+        """Candles with start_date <= start <= end_date (a date means its midnight) as memory-mapped columns"""
+        rows = self.rows(key)
+        begin = 0 if start_date is None else self._position(key, rows, np.datetime64(start_date, "s"), "left")
+        end = rows if end_date is None else self._position(key, rows, np.datetime64(end_date, "s"), "right")
+        return candles.CandleColumns(**{
+            name: self._column(key, name, rows)[begin:max(begin, end)] for name in _DTYPES
+        })
+
+    def append(self, key: str, data: T.Union[list[candles.Candle], candles.CandleColumns]) -> int:
+        """
+        Append sorted candles, return number of written rows
+
+        Candles older than the last stored one are skipped, a candle with the same start
+        replaces the last stored one in place (it was still forming when it was stored).
+        """
+        columns = data if isinstance(data, candles.CandleColumns) else candles.CandleColumns.from_candles(data)
+        os.makedirs(os.path.join(self.directory, key), exist_ok=True)
+        stored = self.rows(key)
+        start = columns.start.astype(_DTYPES["start"])
+        rows = stored
+        skip = 0
+        if stored > 0:
+            last = self._column(key, "start", stored)[-1]
+            skip = int(np.searchsorted(start, last, side="left"))
+            if skip < len(start) and start[skip] == last:
+                rows -= 1
+        for name, dtype in _DTYPES.items():
+            values = np.ascontiguousarray(getattr(columns, name)[skip:], dtype=dtype)
+            path = self._path(key, f"{name}.bin")
+            with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+                # drop rows of a torn append, readers never map rows after stored ones,
+                # and rewrite the replaced last row in place
+                f.truncate(stored * dtype.itemsize)
+                f.seek(rows * dtype.itemsize)
+                f.write(values.tobytes())
+        total = rows + len(start) - skip
+        index = np.ascontiguousarray(
+            np.memmap(self._path(key, "start.bin"), dtype=_DTYPES["start"], mode="r", shape=(total,))[::_INDEX_STEP]
+            if total else np.empty(0, dtype=_DTYPES["start"])
+        )
+        with open(self._path(key, f"{_INDEX}.tmp"), "wb") as f:
+            f.write(index.tobytes())
+        os.replace(self._path(key, f"{_INDEX}.tmp"), self._path(key, _INDEX))
+        with open(self._path(key, f"{_META}.tmp"), "w") as f:
+            json.dump({"version": _META_VERSION, "rows": total}, f)
+        os.replace(self._path(key, f"{_META}.tmp"), self._path(key, _META))
+        return len(start) - skip
+
+    def update(
+        self,
+        key: str,
+        ticker: tickers.Ticker,
+        board: str,
+        interval: T.Optional[int] = None,
+        start_date: T.Optional[datetime.datetime] = None,
+    ) -> int:
+        """Load candles of ticker board since the last stored candle (or start_date) and append them"""
+        rows = self.rows(key)
+        if rows > 0:
+            start_date = self._column(key, "start", rows)[-1].astype(object)
+        fetched = candles._parse_candles_one_board_columns(
+            ticker,
+            board,
+            start_date=start_date,
+            interval=interval,
+            use_cache=False,
+        )
+        return self.append(key, fetched)
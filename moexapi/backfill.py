@@ -0,0 +1,196 @@
+import typing as T
+
+import concurrent.futures
+import dataclasses
+import datetime
+import json
+import os
+
+import numpy as np
+
+from . import candles
+from . import markets
+from . import tickers
+from . import utils
+
+
+logger = utils.initialize_logging(__file__)
+
+
+_MANIFEST = "manifest.json"
+_MANIFEST_VERSION = 1
+_PENDING = "pending"
+_DONE = "done"
+_FAILED = "failed"
+
+
+@dataclasses.dataclass
+class BackfillUnit:
+    """
+    Candles of one ticker board for dates from start_date till end_date inclusive
+    """
+    secid: str
+    market: str
+    board: str
+    start_date: datetime.date
+    end_date: datetime.date
+    interval: T.Optional[int] = None
+    status: str = _PENDING
+    error: T.Optional[str] = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.secid}_{self.board}_{self.interval}_{self.start_date.isoformat()}_{self.end_date.isoformat()}"
+
+    def to_dict(self) -> dict[str, T.Any]:
+        result = dataclasses.asdict(self)
+        result["start_date"] = self.start_date.isoformat()
+        result["end_date"] = self.end_date.isoformat()
+        return result
+
+    @classmethod
+    def from_dict(cls, line: dict[str, T.Any]) -> "BackfillUnit":
+        line = dict(line)
+        line["start_date"] = datetime.date.fromisoformat(line["start_date"])
+        line["end_date"] = datetime.date.fromisoformat(line["end_date"])
+        return cls(**line)
+
+
+@dataclasses.dataclass
+class BackfillReport:
+    done: list[str]
+    failed: dict[str, str]
+
+
+def plan_backfill(
+    ticker_list: list[tickers.Ticker],
+    start_date: datetime.date,
+    end_date: datetime.date,
+    interval: T.Optional[int] = None,
+    chunk: datetime.timedelta = datetime.timedelta(days=30),
+) -> list[BackfillUnit]:
+    """Split candles of all boards of tickers into units of chunk days"""
+    result = []
+    for ticker in ticker_list:
+        for board in ticker.boards:
+            date = start_date
+            while date <= end_date:
+                till = min(date + chunk - datetime.timedelta(days=1), end_date)
+                result.append(
+                    BackfillUnit(
+                        secid=ticker.secid,
+                        market=str(ticker.market),
+                        board=board,
+                        start_date=date,
+                        end_date=till,
+                        interval=interval,
+                    )
+                )
+                date = till + datetime.timedelta(days=1)
+    return result
+
+
+def _unit_path(directory: str, key: str) -> str:
+    return os.path.join(directory, "units", f"{key}.npz")
+
+
+def _read_manifest(directory: str) -> list[BackfillUnit]:
+    path = os.path.join(directory, _MANIFEST)
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        manifest = json.load(f)
+    assert manifest["version"] == _MANIFEST_VERSION, f"Unsupported manifest version {manifest['version']}"
+    return [BackfillUnit.from_dict(line) for line in manifest["units"]]
+
+
+def _write_manifest(directory: str, units: list[BackfillUnit]) -> None:
+    path = os.path.join(directory, _MANIFEST)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump({"version": _MANIFEST_VERSION, "units": [unit.to_dict() for unit in units]}, f)
+    os.replace(f"{path}.tmp", path)
+
+
+def _load_unit(unit: BackfillUnit) -> list[candles.Candle]:
+    """Load candles of unit from ISS"""
+    ticker = tickers.Ticker(
+        secid=unit.secid,
+        alias=unit.secid,
+        is_traded=True,
+        market=markets.get_market(unit.market),
+        shortname=None,
+        isin=None,
+        subtype=None,
+        listlevel=None,
+        boards=[unit.board],
+    )
+    return candles._parse_candles_one_board(
+        ticker,
+        unit.board,
+        start_date=datetime.datetime.combine(unit.start_date, datetime.time()),
+        end_date=datetime.datetime.combine(unit.end_date, datetime.time(23, 59, 59)),
+        interval=unit.interval,
+    )
+
+
+def _run_unit(unit: BackfillUnit, directory: str, loader: T.Callable[[BackfillUnit], list[candles.Candle]]) -> None:
+    columns = candles.CandleColumns.from_candles(loader(unit))
+    path = _unit_path(directory, unit.key)
+    with open(f"{path}.tmp", "wb") as f:
+        np.savez(f, **dataclasses.asdict(columns))
+    os.replace(f"{path}.tmp", path)
+
+
+def run_backfill(
+    directory: str,
+    units: T.Optional[list[BackfillUnit]] = None,
+    max_workers: T.Optional[int] = None,
+    loader: T.Callable[[BackfillUnit], list[candles.Candle]] = _load_unit,
+) -> BackfillReport:
+    """
+    Load units in process pool and save every unit to directory
+
+    Progress is kept in directory manifest, so after a crash or failed units
+    call run_backfill again (units may be omitted) and only unfinished units are loaded.
+    loader is called in worker processes, so it must be picklable (e.g. a module level function).
+    """
+    os.makedirs(os.path.join(directory, "units"), exist_ok=True)
+    planned = {unit.key: unit for unit in _read_manifest(directory)}
+    for unit in units or []:
+        if unit.key not in planned:
+            planned[unit.key] = unit
+    all_units = list(planned.values())
+    _write_manifest(directory, all_units)
+    pending = [unit for unit in all_units if unit.status != _DONE]
+    logger.info(f"Backfill {len(pending)} of {len(all_units)} units")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(_run_unit, unit, directory, loader): unit for unit in pending}
+        for idx, future in enumerate(concurrent.futures.as_completed(futures)):
+            unit = futures[future]
+            try:
+                future.result()
+                unit.status = _DONE
+                unit.error = None
+            except Exception as ex:
+                logger.error(f"Backfill of {unit.key} failed: {ex!r}")
+                unit.status = _FAILED
+                unit.error = repr(ex)
+            _write_manifest(directory, all_units)
+            logger.debug(f"Backfill progress {idx + 1}/{len(pending)}")
+    return BackfillReport(
+        done=[unit.key for unit in all_units if unit.status == _DONE],
+        failed={unit.key: unit.error for unit in all_units if unit.status == _FAILED},
+    )
+
+
+def load_backfill(directory: str, secid: str, board: T.Optional[str] = None) -> list[candles.Candle]:
+    """Return saved candles of secid, candles of different boards are merged"""
+    by_board: dict[str, list[candles.Candle]] = {}
+    units = [unit for unit in _read_manifest(directory) if unit.secid == secid and unit.status == _DONE]
+    for unit in sorted(units, key=lambda unit: unit.start_date):
+        if board is not None and unit.board != board:
+            continue
+        with np.load(_unit_path(directory, unit.key)) as data:
+            columns = candles.CandleColumns(**{key: data[key] for key in data.files})
+        by_board.setdefault(unit.board, []).extend(columns.to_candles())
+    return candles._merge_candles_list(list(by_board.values()))
@@ -3,6 +3,8 @@ import typing as T
 import dataclasses
 import datetime
 
+import numpy as np
+
 from . import tickers
 from . import utils
 
@@ -10,12 +12,36 @@ from . import utils
 logger = utils.initialize_logging(__file__)
 
 
-def _max(first, second):
-    if first is not None and second is not None:
-        return max(first, second)
-    if first is not None:
-        return first
-    return second
+_BONDIZATION_PAGE_SIZE = 100
+# block -> (requested columns, columns of deduplication key)
+_BONDIZATION_BLOCKS = {
+    "amortizations": (["amortdate", "value", "initialfacevalue"], ["amortdate"]),
+    "coupons": (["coupondate", "recorddate", "startdate", "value", "initialfacevalue"], ["coupondate"]),
+    "offers": (["offerdate", "offertype", "value"], ["offerdate", "offertype"]),
+}
+
+
+def _load_bondization_block(secid: str, block: str) -> list[dict[str, T.Any]]:
+    """Page through one bondization block with its own cursor"""
+    columns, key_columns = _BONDIZATION_BLOCKS[block]
+    params = utils.iss_params({block: columns, f"{block}.cursor": None})
+    lines: dict[tuple, dict[str, T.Any]] = {}
+    start = 0
+    while True:
+        response = utils.json_api_call(
+            f"https://iss.moex.com/iss/securities/{secid}/bondization.json"
+            f"?limit={_BONDIZATION_PAGE_SIZE}&start={start}&{params}"
+        )
+        page = utils.prepare_dict(response, block)
+        for line in page:
+            lines.setdefault(tuple(line.get(column) for column in key_columns), line)
+        cursor = utils.prepare_dict(response, f"{block}.cursor")
+        if len(page) == 0 or len(cursor) == 0:
+            break
+        start = cursor[0]["INDEX"] + cursor[0]["PAGESIZE"]
+        if start >= cursor[0]["TOTAL"]:
+            break
+    return list(lines.values())
 
 
 @dataclasses.dataclass
@@ -27,10 +53,15 @@ class Amortization:
 
 @dataclasses.dataclass
 class Coupon:
+    """
+    date -- payment date, it ends coupon period
+    record_date -- holders on this date get the coupon, None if it is not set
+    """
     date: datetime.date
     start_date: datetime.date
     value: float
     initialfacevalue: float
+    record_date: T.Optional[datetime.date] = None
 
     def __repr__(self) -> str:
         return f'Coupon(date={self.date.isoformat()}, value={self.value})'
@@ -42,6 +73,31 @@ class Offer:
     value: float
 
 
+@dataclasses.dataclass
+class Cashflow:
+    """
+    Payments of bond on date
+
+    coupon -- sum of coupons, None if some coupon value is unknown yet
+    amortization -- sum of face value repayments
+    """
+    date: datetime.date
+    coupon: T.Optional[float]
+    amortization: float
+
+
+def _to_dates(date: T.Union[datetime.date, T.Sequence[datetime.date], np.ndarray]) -> np.ndarray:
+    if isinstance(date, datetime.date):
+        return np.datetime64(date, "D")
+    return np.asarray(date, dtype="datetime64[D]")
+
+
+def _to_result(values: np.ndarray) -> T.Union[float, np.ndarray]:
+    if np.ndim(values) == 0:
+        return float(values)
+    return values
+
+
 @dataclasses.dataclass(init=True)
 class Bond:
     secid: str
@@ -82,47 +138,28 @@ class Bond:
             self.coupon_frequency = int(ticker_info["COUPONFREQUENCY"]) if "COUPONFREQUENCY" in ticker_info else None
             self.evening_session = bool(ticker_info.get("EVENINGSESSION", False))
             self.coupon_percent = float(ticker_info["COUPONPERCENT"]) if "COUPONPERCENT" in ticker_info else None
-            self.amortization = []
-            self.coupons = []
-            self.offers = []
-            limit = 100
-            start_date: T.Optional[datetime.date] = None
-            while True:
-                start_str = f"&from={start_date.isoformat()}" if start_date else ""
-                response = utils.json_api_call(
-                    f"https://iss.moex.com/iss/securities/{ticker.secid}/bondization.json?limit={limit}{start_str}"
+            self.amortization = [
+                Amortization(
+                    date=datetime.date.fromisoformat(line["amortdate"]),
+                    value=line["value"],
+                    initialfacevalue=line["initialfacevalue"],
+                )
+                for line in _load_bondization_block(ticker.secid, "amortizations")
+            ]
+            self.coupons = [
+                Coupon(
+                    date=datetime.date.fromisoformat(line["coupondate"]),
+                    start_date=datetime.date.fromisoformat(line["startdate"]),
+                    value=line["value"],
+                    initialfacevalue=line["initialfacevalue"],
+                    record_date=datetime.date.fromisoformat(line["recorddate"]) if line["recorddate"] else None,
                 )
-                amortization = utils.prepare_dict(response, "amortizations")
-                coupons = utils.prepare_dict(response, "coupons")
-                offers = utils.prepare_dict(response, "offers")
-                end_date = None
-                for line in amortization:
-                    date = datetime.date.fromisoformat(line["amortdate"])
-                    end_date = _max(end_date, date)
-                    self.amortization.append(
-                        Amortization(date=date, value=line["value"], initialfacevalue=line["initialfacevalue"])
-                    )
-                for line in coupons:
-                    date = datetime.date.fromisoformat(line["recorddate"] if line["recorddate"] else line["coupondate"])
-                    end_date = _max(end_date, date)
-                    self.coupons.append(
-                        Coupon(
-                            date=date,
-                            start_date=datetime.date.fromisoformat(line["startdate"]),
-                            value=line["value"],
-                            initialfacevalue=line["initialfacevalue"],
-                        )
-                    )
-                for line in offers:
-                    date = datetime.date.fromisoformat(line["offerdate"])
-                    end_date = _max(end_date, date)
-                    self.offers.append(Offer(date=date, value=line["value"]))
-                if end_date == start_date:
-                    break
-                start_date = end_date
-                self.amortization = [item for item in self.amortization if item.date != start_date]
-                self.coupons = [item for item in self.coupons if item.date != start_date]
-                self.offers = [item for item in self.offers if item.date != start_date]
+                for line in _load_bondization_block(ticker.secid, "coupons")
+            ]
+            self.offers = [
+                Offer(date=datetime.date.fromisoformat(line["offerdate"]), value=line["value"])
+                for line in _load_bondization_block(ticker.secid, "offers")
+            ]
             original_values = [item.value for item in self.amortization]
             amortization_sum = sum(original_values)
             if abs(amortization_sum - self.initial_face_value) > 1e-9 and len(original_values) > 1:
@@ -134,13 +171,31 @@ class Bond:
                         raise ValueError(f"Amortization sum {amortization_sum} is greater than initial face value {self.initial_face_value}")
                 for amortization_item, value in zip(self.amortization, values):
                     amortization_item.value = value
+            self._build_index()
         except Exception as e:
             logger.error(f"{ticker.secid} ({ticker.shortname}): {e}")
             raise e
 
+    def _build_index(self) -> None:
+        """Sorted date arrays for bisect queries over schedules"""
+        self._sorted_coupons = sorted(self.coupons, key=lambda item: item.date)
+        self._coupon_dates = np.array([item.date for item in self._sorted_coupons], dtype="datetime64[D]")
+        self._coupon_starts = np.array([item.start_date for item in self._sorted_coupons], dtype="datetime64[D]")
+        self._coupon_values = np.array([item.value for item in self._sorted_coupons], dtype=float)
+        sorted_amortization = sorted(self.amortization, key=lambda item: item.date)
+        self._amortization_dates = np.array([item.date for item in sorted_amortization], dtype="datetime64[D]")
+        self._amortization_values = np.array([item.value for item in sorted_amortization], dtype=float)
+        self._amortization_paid = np.concatenate([[0.0], np.cumsum(self._amortization_values)])
+        self._sorted_offers = sorted(self.offers, key=lambda item: item.date)
+        self._offer_dates = np.array([item.date for item in self._sorted_offers], dtype="datetime64[D]")
+        self._expiration_date = max(
+            (item.date for item in self.amortization + self.coupons + self.offers),
+            default=None,
+        )
+
     @property
     def expiration_date(self) -> datetime.date:
-        return max(item.date for item in self.amortization + self.coupons + self.offers)
+        return self._expiration_date
 
     def __repr__(self) -> str:
         lines = [
@@ -176,8 +231,8 @@ class Bond:
 
     def next_offer(self, date_from: T.Optional[datetime.date] = None) -> T.Optional[Offer]:
         date_from = date_from or datetime.date.today()
-        result = [offer for offer in self.offers if offer.date >= date_from]
-        return result[0] if len(result) > 0 else None
+        idx = np.searchsorted(self._offer_dates, _to_dates(date_from))
+        return self._sorted_offers[idx] if idx < len(self._sorted_offers) else None
 
     def has_next_offer(self, date_from: T.Optional[datetime.date] = None) -> bool:
         return self.next_offer(date_from=date_from) is not None
@@ -185,3 +240,64 @@ class Bond:
     def next_offer_date(self, date_from: T.Optional[datetime.date] = None) -> T.Optional[datetime.date]:
         offer = self.next_offer(date_from=date_from)
         return offer.date if offer is not None else None
+
+    def next_coupon(self, date_from: T.Optional[datetime.date] = None) -> T.Optional[Coupon]:
+        date_from = date_from or datetime.date.today()
+        idx = np.searchsorted(self._coupon_dates, _to_dates(date_from))
+        return self._sorted_coupons[idx] if idx < len(self._sorted_coupons) else None
+
+    def cashflows_between(self, start_date: datetime.date, end_date: datetime.date) -> list[Cashflow]:
+        """Coupons and amortizations paid on start_date <= date <= end_date grouped by payment date"""
+        start, end = _to_dates(start_date), _to_dates(end_date)
+        coupons = slice(
+            np.searchsorted(self._coupon_dates, start, side="left"),
+            np.searchsorted(self._coupon_dates, end, side="right"),
+        )
+        amortizations = slice(
+            np.searchsorted(self._amortization_dates, start, side="left"),
+            np.searchsorted(self._amortization_dates, end, side="right"),
+        )
+        result: dict[datetime.date, Cashflow] = {}
+        for date, value in zip(self._coupon_dates[coupons].tolist(), self._coupon_values[coupons].tolist()):
+            cashflow = result.setdefault(date, Cashflow(date=date, coupon=0.0, amortization=0.0))
+            cashflow.coupon = None if cashflow.coupon is None or value != value else cashflow.coupon + value
+        for date, value in zip(
+            self._amortization_dates[amortizations].tolist(),
+            self._amortization_values[amortizations].tolist(),
+        ):
+            cashflow = result.setdefault(date, Cashflow(date=date, coupon=0.0, amortization=0.0))
+            cashflow.amortization += value
+        return [result[date] for date in sorted(result)]
+
+    def outstanding_face(
+        self,
+        date: T.Union[datetime.date, T.Sequence[datetime.date], np.ndarray],
+    ) -> T.Union[float, np.ndarray]:
+        """Face value left after amortizations paid till date (inclusive), date may be an array"""
+        idx = np.searchsorted(self._amortization_dates, _to_dates(date), side="right")
+        return _to_result(self.initial_face_value - self._amortization_paid[idx])
+
+    def accrued_interest(
+        self,
+        date: T.Union[datetime.date, T.Sequence[datetime.date], np.ndarray],
+    ) -> T.Union[T.Optional[float], np.ndarray]:
+        """
+        Coupon accrued from start of current coupon period till date, date may be an array
+
+        Returns 0 outside coupon periods and None (nan for arrays) if coupon value is unknown.
+        """
+        dates = _to_dates(date)
+        idx = np.searchsorted(self._coupon_dates, dates, side="right")
+        valid = idx < len(self._coupon_dates)
+        idx = np.where(valid, idx, 0)
+        if len(self._coupon_dates) == 0:
+            result = np.zeros(np.shape(dates))
+        else:
+            starts = self._coupon_starts[idx]
+            ends = self._coupon_dates[idx]
+            valid &= starts <= dates
+            days = np.maximum((ends - starts).astype(np.int64), 1)
+            result = np.where(valid, self._coupon_values[idx] * (dates - starts).astype(np.int64) / days, 0.0)
+        if np.ndim(result) == 0:
+            return None if result != result else float(result)
+        return result
@@ -3,6 +3,9 @@ import typing as T
 import concurrent.futures
 import dataclasses
 import datetime
+import time
+
+import numpy as np
 
 from . import changeover
 from . import splits
@@ -66,6 +69,121 @@ class Candle:
         self.value *= mult
 
 
+@dataclasses.dataclass
+class CandleColumns:
+    """
+    Columnar candles for given ticker
+
+    start, end -- datetime64[s] arrays
+    low, high, open, close -- float64 arrays
+    volume, value -- float64 arrays (nan when unknown)
+    """
+    start: np.ndarray
+    end: np.ndarray
+    low: np.ndarray
+    high: np.ndarray
+    open: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+    value: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    @classmethod
+    def from_candles(cls, candles: list[Candle]) -> "CandleColumns":
+        return cls(
+            start=np.array([candle.start for candle in candles], dtype="datetime64[s]"),
+            end=np.array([candle.end for candle in candles], dtype="datetime64[s]"),
+            low=np.array([candle.low for candle in candles], dtype=float),
+            high=np.array([candle.high for candle in candles], dtype=float),
+            open=np.array([candle.open for candle in candles], dtype=float),
+            close=np.array([candle.close for candle in candles], dtype=float),
+            volume=np.array([candle.volume for candle in candles], dtype=float),
+            value=np.array([candle.value for candle in candles], dtype=float),
+        )
+
+    def to_candles(self) -> list[Candle]:
+        starts = self.start.astype("datetime64[us]").astype(object)
+        ends = self.end.astype("datetime64[us]").astype(object)
+        return [
+            Candle(
+                start=start,
+                end=end,
+                low=low,
+                high=high,
+                open=open,
+                close=close,
+                volume=int(volume) if volume == volume else None,
+                value=value if value == value else None,
+            )
+            for start, end, low, high, open, close, volume, value in zip(
+                starts,
+                ends,
+                self.low.tolist(),
+                self.high.tolist(),
+                self.open.tolist(),
+                self.close.tolist(),
+                self.volume.tolist(),
+                self.value.tolist(),
+            )
+        ]
+
+
+def _bucket_keys(
+    start: np.ndarray,
+    interval: np.timedelta64,
+    offset: np.timedelta64,
+) -> tuple[np.ndarray, np.ndarray]:
+    day = np.timedelta64(1, "D")
+    if interval >= day:
+        # 1970-01-05 is a Monday, so weekly buckets start on Mondays
+        origin = np.datetime64("1970-01-05", "s") + offset
+        keys = (start - origin) // interval
+        return keys, origin + keys * interval
+    days = (start - offset).astype("datetime64[D]").astype("datetime64[s]") + offset
+    slots = (start - days) // interval
+    keys = (days - np.datetime64(0, "s")) // day * -(-day // interval) + slots
+    return keys, days + slots * interval
+
+
+def resample_candles(
+    candles: T.Union[list[Candle], CandleColumns],
+    interval: datetime.timedelta,
+    offset: datetime.timedelta = datetime.timedelta(0),
+) -> T.Union[list[Candle], CandleColumns]:
+    """
+    Aggregate sorted candles into buckets of given interval
+
+    Intraday buckets are aligned to midnight + offset of every day and never span two days,
+    so offset=timedelta(hours=10) gives 10:00, 10:15, ... for interval=timedelta(minutes=15).
+    Buckets of one day and longer are aligned to Monday, so timedelta(days=7) gives weekly bars.
+    Result has the same type as the input.
+    """
+    columns = candles if isinstance(candles, CandleColumns) else CandleColumns.from_candles(candles)
+    step = np.timedelta64(interval, "s")
+    assert step > np.timedelta64(0, "s"), f"Wrong interval {interval}"
+    if len(columns) == 0:
+        result = columns
+    else:
+        keys, bucket_start = _bucket_keys(columns.start, step, np.timedelta64(offset, "s"))
+        first = np.concatenate([[0], np.flatnonzero(np.diff(keys)) + 1])
+        last = np.concatenate([first[1:], [len(keys)]]) - 1
+        result = CandleColumns(
+            start=bucket_start[first],
+            end=columns.end[last],
+            low=np.minimum.reduceat(columns.low, first),
+            high=np.maximum.reduceat(columns.high, first),
+            open=columns.open[first],
+            close=columns.close[last],
+            volume=np.add.reduceat(columns.volume, first),
+            value=np.add.reduceat(columns.value, first),
+        )
+    if isinstance(candles, CandleColumns):
+        return result
+    return result.to_candles()
+
+
 def _merge_candles(first: list[Candle], second: list[Candle]) -> list[Candle]:
     i = 0
     j = 0
@@ -97,54 +215,80 @@ def _merge_candles_list(candles: list[list[Candle]]) -> list[Candle]:
     return result
 
 
-def _parse_candles_one_board(
+_CANDLE_COLUMNS = ["begin", "end", "low", "high", "open", "close", "volume", "value"]
+_CANDLE_PARAMS = utils.iss_params({"candles": _CANDLE_COLUMNS})
+
+
+def _candle_page_columns(response: T.Any) -> CandleColumns:
+    """Convert candles block to arrays and drop candles without prices"""
+    page = utils.prepare_columns(response, "candles", _CANDLE_COLUMNS)
+    prices = np.stack([page[name].astype(float) for name in ["low", "high", "open", "close"]])
+    mask = np.all(np.isfinite(prices) & (prices != 0.0), axis=0)
+    return CandleColumns(
+        start=page["begin"][mask].astype("datetime64[s]"),
+        end=page["end"][mask].astype("datetime64[s]"),
+        low=prices[0][mask],
+        high=prices[1][mask],
+        open=prices[2][mask],
+        close=prices[3][mask],
+        volume=page["volume"][mask].astype(float),
+        value=page["value"][mask].astype(float),
+    )
+
+
+def _concat_candle_columns(pages: list[CandleColumns]) -> CandleColumns:
+    return CandleColumns(**{
+        field.name: np.concatenate([getattr(page, field.name) for page in pages])
+        for field in dataclasses.fields(CandleColumns)
+    })
+
+
+def _parse_candles_one_board_columns(
     ticker: tickers.Ticker,
     board: str,
     start_date: T.Optional[T.Union[datetime.datetime, str]] = None,
     end_date: T.Optional[T.Union[datetime.datetime, str]] = None,
     interval: T.Optional[int] = None,
-) -> list[Candle]:
-    result = []
-    if isinstance(start_date, str):
-        start_date = datetime.datetime.fromisoformat(start_date)
-    if isinstance(end_date, str):
-        end_date = datetime.datetime.fromisoformat(end_date)
+    use_cache: bool = True,
+) -> CandleColumns:
+    pages = [CandleColumns.from_candles([])]
+    if isinstance(start_date, datetime.datetime):
+        start_date = start_date.isoformat()
+    if isinstance(end_date, datetime.datetime):
+        end_date = end_date.isoformat()
     while True:
-        start_str = f"from={start_date.isoformat()}" if start_date else ""
-        end_str = f"till={end_date.isoformat()}" if end_date else ""
+        start_str = f"from={start_date}" if start_date else ""
+        end_str = f"till={end_date}" if end_date else ""
         interval_str = f"interval={interval}" if interval else ""
-        query = "?" + "&".join([item for item in [start_str, end_str, interval_str] if item])
+        query = "?" + "&".join([item for item in [start_str, end_str, interval_str, _CANDLE_PARAMS] if item])
         response = utils.json_api_call(
-            f"https://iss.moex.com/iss{ticker.market.path}/boards/{board}/securities/{ticker.secid}/candles.json{query}"
+            f"https://iss.moex.com/iss{ticker.market.path}/boards/{board}/securities/{ticker.secid}/candles.json{query}",
+            use_cache=use_cache,
         )
-        candles = utils.prepare_dict(response, "candles")
-        for line in candles:
-            start = datetime.datetime.fromisoformat(line["begin"])
-            end = datetime.datetime.fromisoformat(line["end"])
-            start_date = end
-            low = line["low"]
-            high = line["high"]
-            open = line["open"]
-            close = line["close"]
-            if low is None or high is None or open is None or close is None:
-                continue
-            if low == 0.0 or high == 0.0 or open == 0.0 or close == 0.0:
-                continue
-            result.append(
-                Candle(
-                    start=start,
-                    end=end,
-                    low=low,
-                    high=high,
-                    open=open,
-                    close=close,
-                    volume=line.get("volume"),
-                    value=line.get("value"),
-                )
-            )
-        if len(candles) == 0:
+        data = response["candles"]["data"]
+        if len(data) == 0:
             break
-    return result
+        start_date = data[-1][response["candles"]["columns"].index("end")].replace(" ", "T")
+        pages.append(_candle_page_columns(response))
+    return _concat_candle_columns(pages)
+
+
+def _parse_candles_one_board(
+    ticker: tickers.Ticker,
+    board: str,
+    start_date: T.Optional[T.Union[datetime.datetime, str]] = None,
+    end_date: T.Optional[T.Union[datetime.datetime, str]] = None,
+    interval: T.Optional[int] = None,
+    use_cache: bool = True,
+) -> list[Candle]:
+    return _parse_candles_one_board_columns(
+        ticker,
+        board,
+        start_date=start_date,
+        end_date=end_date,
+        interval=interval,
+        use_cache=use_cache,
+    ).to_candles()
 
 
 def _parse_candles(
@@ -199,3 +343,91 @@ def get_candles_batch(
 
     with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
         return list(executor.map(load, ticker_list))
+
+
+@dataclasses.dataclass
+class CandleUpdate:
+    """
+    New or changed candle emitted by CandlePoller
+
+    is_complete -- False for the last (still forming) candle of the board
+    """
+    ticker: tickers.Ticker
+    board: str
+    candle: Candle
+    is_complete: bool
+
+
+class CandlePoller:
+    """
+    Poll ISS for fresh candles of given tickers
+
+    Poller remembers the last candle of every board and on each poll asks only for candles
+    starting from it, so the forming candle is updated and new ones are appended.
+    Every candle is emitted with is_complete=True once a newer candle exists, even if unchanged.
+    Changeovers and splits are not applied.
+    """
+    def __init__(
+        self,
+        ticker_list: list[tickers.Ticker],
+        interval: int = 1,
+        start_date: T.Optional[T.Union[datetime.datetime, datetime.date, str]] = None,
+        max_workers: T.Optional[int] = None,
+    ):
+        if start_date is None:
+            start_date = datetime.datetime.combine(datetime.date.today(), datetime.time())
+        elif isinstance(start_date, str):
+            start_date = datetime.datetime.fromisoformat(start_date)
+        elif not isinstance(start_date, datetime.datetime):
+            start_date = datetime.datetime.combine(start_date, datetime.time())
+        self.interval = interval
+        self.max_workers = max_workers
+        self._start_date = start_date
+        self._boards = [(ticker, board) for ticker in ticker_list for board in ticker.boards]
+        self._last: dict[tuple[str, str], Candle] = {}
+
+    def last_candle(self, ticker: tickers.Ticker, board: str) -> T.Optional[Candle]:
+        return self._last.get((ticker.secid, board))
+
+    def _poll_board(self, ticker: tickers.Ticker, board: str) -> list[CandleUpdate]:
+        last = self._last.get((ticker.secid, board))
+        candles = _parse_candles_one_board(
+            ticker,
+            board,
+            start_date=last.start if last is not None else self._start_date,
+            interval=self.interval,
+            use_cache=False,
+        )
+        result = []
+        for idx, candle in enumerate(candles):
+            is_complete = idx + 1 < len(candles)
+            # unchanged last candle is emitted again once it is complete
+            if last is not None and (candle.start < last.start or (candle == last and not is_complete)):
+                continue
+            result.append(CandleUpdate(ticker=ticker, board=board, candle=candle, is_complete=is_complete))
+        if candles:
+            self._last[(ticker.secid, board)] = candles[-1]
+        return result
+
+    def poll(self) -> list[CandleUpdate]:
+        """Return candles that appeared or changed since previous poll"""
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            updates = executor.map(lambda item: self._poll_board(*item), self._boards)
+            return [update for board_updates in updates for update in board_updates]
+
+    def run(
+        self,
+        callback: T.Callable[[list[CandleUpdate]], None],
+        period: float = 60,
+        iterations: T.Optional[int] = None,
+    ) -> None:
+        """Call poll every period seconds and pass non-empty updates to callback"""
+        idx = 0
+        while iterations is None or idx < iterations:
+            started = time.monotonic()
+            updates = self.poll()
+            if updates:
+                callback(updates)
+            idx += 1
+            if iterations is None or idx < iterations:
+                time.sleep(max(0.0, period - (time.monotonic() - started)))
@@ -1,3 +1,5 @@
+import typing as T
+
 import dataclasses
 import datetime
 
@@ -7,6 +9,9 @@ from . import utils
 
 logger = utils.initialize_logging(__file__)
 
+# filled by universe.install_universe
+_PRELOADED_CHANGEOVERS: T.Optional[list["Changeover"]] = None
+
 
 @dataclasses.dataclass
 class Changeover:
@@ -20,9 +25,12 @@ class Changeover:
 
 def get_changeovers() -> list[Changeover]:
     """Return changeovers in sorted by date order"""
+    if _PRELOADED_CHANGEOVERS is not None:
+        return sorted(_PRELOADED_CHANGEOVERS)
     result = []
     response = utils.json_api_call(
-        "https://iss.moex.com/iss/history/engines/stock/markets/shares/securities/changeover.json"
+        "https://iss.moex.com/iss/history/engines/stock/markets/shares/securities/changeover.json?"
+        + utils.iss_params({"changeover": ["action_date", "old_secid", "new_secid"]})
     )
     changeover = utils.prepare_dict(response, "changeover")
     for line in changeover:
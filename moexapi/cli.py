@@ -0,0 +1,168 @@
+import typing as T
+
+import argparse
+import concurrent.futures
+import csv
+import dataclasses
+import datetime
+import json
+import os
+
+import numpy as np
+
+from . import candles
+from . import history
+from . import markets
+from . import tickers
+from . import utils
+
+
+logger = utils.initialize_logging(__file__)
+
+
+_SUCCESS = "_SUCCESS"
+
+
+def _load_columns(
+    ticker: tickers.Ticker,
+    start_date: datetime.date,
+    end_date: datetime.date,
+    interval: T.Optional[int],
+) -> dict[str, np.ndarray]:
+    """History (interval is None) or candles of ticker with splits and changeovers applied"""
+    if interval is None:
+        data = history.HistoryColumns.from_history(history.get_history(ticker, start_date=start_date, end_date=end_date))
+    else:
+        data = candles.CandleColumns.from_candles(
+            candles.get_candles(ticker, start_date=start_date, end_date=end_date, interval=interval)
+        )
+    return dataclasses.asdict(data)
+
+
+def _write_partition(path: str, columns: dict[str, np.ndarray], output_format: str) -> None:
+    if output_format == "parquet":
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as ex:
+            raise RuntimeError("Install pyarrow (pip install moexapi[parquet]) to export parquet") from ex
+        pyarrow.parquet.write_table(pyarrow.table(columns), f"{path}.tmp")
+    else:
+        with open(f"{path}.tmp", "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(list(columns))
+            for row in zip(*[values.tolist() for values in columns.values()]):
+                writer.writerow(["" if value is None or value != value else value for value in row])
+    os.replace(f"{path}.tmp", path)
+
+
+def export_ticker(
+    ticker: tickers.Ticker,
+    output: str,
+    start_date: datetime.date,
+    end_date: datetime.date,
+    interval: T.Optional[int] = None,
+    output_format: str = "csv",
+) -> int:
+    """
+    Write data of ticker to output/SECID/YEAR.format, return number of rows
+
+    _SUCCESS marker keeps export parameters, a ticker exported with the same ones is skipped,
+    otherwise its partitions are removed and exported again.
+    """
+    directory = os.path.join(output, ticker.secid)
+    marker = os.path.join(directory, _SUCCESS)
+    params = {
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "interval": interval,
+        "format": output_format,
+    }
+    if os.path.exists(marker):
+        with open(marker) as f:
+            try:
+                exported = json.load(f)
+            except ValueError:
+                exported = None
+        if exported == params:
+            return 0
+        logger.info(f"{ticker.secid} was exported with {exported}, export it again with {params}")
+        os.remove(marker)
+        for name in os.listdir(directory):
+            if name.endswith((".csv", ".parquet")):
+                os.remove(os.path.join(directory, name))
+    os.makedirs(directory, exist_ok=True)
+    columns = _load_columns(ticker, start_date, end_date, interval)
+    dates = columns["date" if interval is None else "start"]
+    years = dates.astype("datetime64[Y]").astype(int) + 1970
+    for year in np.unique(years).tolist():
+        mask = years == year
+        _write_partition(
+            os.path.join(directory, f"{year}.{output_format}"),
+            {name: values[mask] for name, values in columns.items()},
+            output_format,
+        )
+    with open(f"{marker}.tmp", "w") as f:
+        json.dump(params, f)
+    os.replace(f"{marker}.tmp", marker)
+    return len(dates)
+
+
+def export(
+    market: markets.Market,
+    output: str,
+    start_date: datetime.date,
+    end_date: datetime.date,
+    interval: T.Optional[int] = None,
+    output_format: str = "csv",
+    max_workers: int = 8,
+    is_traded: T.Optional[bool] = True,
+    limit: T.Optional[int] = None,
+) -> list[str]:
+    """Export all tickers of market concurrently, return secids which failed (rerun to retry them)"""
+    ticker_list = tickers.get_tickers(market, is_traded=is_traded, limit=limit, lazy=True)
+    failed = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(export_ticker, ticker, output, start_date, end_date, interval, output_format): ticker
+            for ticker in ticker_list
+        }
+        for idx, future in enumerate(concurrent.futures.as_completed(futures)):
+            ticker = futures[future]
+            try:
+                rows = future.result()
+                logger.info(f"[{idx + 1}/{len(futures)}] {ticker.secid}: {rows} rows")
+            except Exception as ex:
+                logger.error(f"[{idx + 1}/{len(futures)}] {ticker.secid}: {ex!r}")
+                failed.append(ticker.secid)
+    return failed
+
+
+def main(argv: T.Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="moexapi", description="Python API for MOEX ISS")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="download history or candles of market tickers")
+    export_parser.add_argument("--market", required=True, help="market name, e.g. shares, etfs, federal_bonds")
+    export_parser.add_argument("--start", required=True, type=datetime.date.fromisoformat)
+    export_parser.add_argument("--end", default=datetime.date.today(), type=datetime.date.fromisoformat)
+    export_parser.add_argument("--interval", type=int, help="ISS candle interval (1, 10, 60, 24, 7, 31, 4), daily history by default")
+    export_parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    export_parser.add_argument("--output", required=True)
+    export_parser.add_argument("--workers", type=int, default=8)
+    export_parser.add_argument("--limit", type=int)
+    export_parser.add_argument("--all", action="store_true", help="export not traded tickers too")
+    args = parser.parse_args(argv)
+    failed = export(
+        markets.get_market(args.market),
+        args.output,
+        args.start,
+        args.end,
+        interval=args.interval,
+        output_format=args.format,
+        max_workers=args.workers,
+        is_traded=None if args.all else True,
+        limit=args.limit,
+    )
+    if failed:
+        logger.error(f"Failed tickers: {', '.join(failed)}")
+    return 1 if failed else 0
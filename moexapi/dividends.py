@@ -17,7 +17,8 @@ Dividends = list[Dividend]
 
 
 def _get_dividends_for_one_ticker(ticker: tickers.Ticker):
-    resp = utils.json_api_call(f"https://iss.moex.com/iss/securities/{ticker.secid}/dividends.json")['dividends']
+    params = utils.iss_params({"dividends": ["registryclosedate", "value"]})
+    resp = utils.json_api_call(f"https://iss.moex.com/iss/securities/{ticker.secid}/dividends.json?{params}")['dividends']
     columns = resp['columns']
     data = resp['data']
     dividends: Dividends = []
@@ -1,8 +1,5 @@
 import typing as T
 
-import bs4
-import requests
-
 from . import markets
 from . import tickers
 from . import utils
@@ -14,7 +11,10 @@ def get_moex_rate(currency: str) -> T.Optional[float]:
 
 def get_moex_usd_eur_rate(currency: str) -> T.Optional[float]:
     response = utils.prepare_dict(
-        utils.json_api_call("https://iss.moex.com/iss/statistics/engines/currency/markets/selt/rates.json"),
+        utils.json_api_call(
+            "https://iss.moex.com/iss/statistics/engines/currency/markets/selt/rates.json?"
+            + utils.iss_params({"cbrf": ["CBRF_USD_LAST", "CBRF_EUR_LAST"]})
+        ),
         "cbrf"
     )[0]
     if currency == "USD":
@@ -27,15 +27,16 @@ def get_moex_usd_eur_rate(currency: str) -> T.Optional[float]:
 def get_cbrf_rate(currency: str) -> float:
     if currency == "RUB":
         return 1.0
-    resp = requests.get(
+    import bs4
+
+    text = utils.get_text(
         "https://www.cbr.ru/currency_base/daily",
         headers={
             "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 "
             "(KHTML, like Gecko) Version/15.3 Safari/605.1.15"
         },
     )
-    assert resp.status_code == 200, "Can't parse echange rate from cbrf"
-    soup = bs4.BeautifulSoup(resp.text, features="lxml")
+    soup = bs4.BeautifulSoup(text, features="lxml")
     tables = soup.find_all("table")
     assert len(tables) == 1
     rows = tables[0].find_all("tr")
@@ -0,0 +1,240 @@
+import typing as T
+
+import dataclasses
+import datetime
+
+import numpy as np
+
+from . import candles
+from . import history
+from . import tickers
+
+
+# ISS candle intervals which have a fixed length, candles default to 10 minutes
+_CANDLE_INTERVALS = {
+    1: datetime.timedelta(minutes=1),
+    10: datetime.timedelta(minutes=10),
+    60: datetime.timedelta(hours=1),
+    24: datetime.timedelta(days=1),
+}
+_DEFAULT_INTERVAL = 10
+
+
+@dataclasses.dataclass
+class Gap:
+    """
+    Window of missing bars
+
+    start, end -- start of first and last missing candle (datetimes), or first and last missing date for daily data
+    missing -- number of missing bars inside the window
+    """
+    start: T.Union[datetime.datetime, datetime.date]
+    end: T.Union[datetime.datetime, datetime.date]
+    missing: int
+
+
+_Data = T.Union[list[candles.Candle], candles.CandleColumns, list[history.History], history.HistoryColumns]
+
+
+def _days(data: _Data) -> np.ndarray:
+    if isinstance(data, candles.CandleColumns):
+        return data.start.astype("datetime64[D]")
+    if isinstance(data, history.HistoryColumns):
+        return data.date
+    return np.array(
+        [item.start.date() if isinstance(item, candles.Candle) else item.date for item in data],
+        dtype="datetime64[D]",
+    )
+
+
+def trading_days(*data: _Data) -> list[datetime.date]:
+    """
+    Calendar implied by data: days with candles or history in any of data
+
+    Pass data of all loaded tickers or boards (or of a liquid ticker), so days missing
+    in one of them are found while exchange holidays are not.
+    """
+    days = [_days(item) for item in data]
+    return np.unique(np.concatenate(days + [np.empty(0, dtype="datetime64[D]")])).astype(object).tolist()
+
+
+def weekday_calendar(start_date: datetime.date, end_date: datetime.date) -> list[datetime.date]:
+    """Weekdays from start_date till end_date, exchange holidays are included"""
+    days = np.arange(np.datetime64(start_date, "D"), np.datetime64(end_date, "D") + np.timedelta64(1, "D"))
+    return days[np.is_busday(days)].astype(object).tolist()
+
+
+def _calendar(
+    dates: np.ndarray,
+    calendar: T.Optional[T.Iterable[datetime.date]],
+) -> np.ndarray:
+    """Trading days as datetime64[D], by default days of data"""
+    if calendar is not None:
+        return np.unique(np.array(list(calendar), dtype="datetime64[D]"))
+    return np.unique(dates)
+
+
+def _date_gaps(dates: np.ndarray, calendar: np.ndarray) -> list[Gap]:
+    """Group calendar days absent in dates into windows of consecutive calendar days"""
+    missing = np.flatnonzero(~np.isin(calendar, dates))
+    if len(missing) == 0:
+        return []
+    first = np.concatenate([[0], np.flatnonzero(np.diff(missing) > 1) + 1])
+    last = np.concatenate([first[1:], [len(missing)]]) - 1
+    starts = calendar[missing[first]].astype(object).tolist()
+    ends = calendar[missing[last]].astype(object).tolist()
+    return [
+        Gap(start=start, end=end, missing=int(count))
+        for start, end, count in zip(starts, ends, (last - first + 1).tolist())
+    ]
+
+
+def _intraday_gaps(
+    start: np.ndarray,
+    step: np.timedelta64,
+    calendar: np.ndarray,
+    min_missing: int,
+) -> list[Gap]:
+    """
+    Missing slots of every calendar day grouped into one window per day
+
+    Session of a day is implied by data: it spans from the most common first slot
+    till the most common last slot of days with candles (widened by candles of that day).
+    """
+    days = start.astype("datetime64[D]")
+    slots = ((start - days.astype("datetime64[s]")) // step).astype(np.int64)
+    day_values, day_index = np.unique(days, return_inverse=True)
+    first = np.full(len(day_values), np.iinfo(np.int64).max)
+    last = np.full(len(day_values), -1)
+    np.minimum.at(first, day_index, slots)
+    np.maximum.at(last, day_index, slots)
+    open_slot = np.bincount(first).argmax()
+    close_slot = np.bincount(last).argmax()
+    calendar = np.union1d(calendar, day_values)
+    lo = np.full(len(calendar), open_slot)
+    hi = np.full(len(calendar), close_slot)
+    position = np.searchsorted(calendar, day_values)
+    lo[position] = np.minimum(open_slot, first)
+    hi[position] = np.maximum(close_slot, last)
+    counts = hi - lo + 1
+    offsets = np.repeat(np.cumsum(counts) - counts, counts)
+    grid_days = np.repeat(calendar, counts)
+    grid_slots = np.repeat(lo, counts) + np.arange(counts.sum()) - offsets
+    slots_per_day = -(-np.timedelta64(1, "D") // step)
+    keys = days.astype(np.int64) * slots_per_day + slots
+    grid_keys = grid_days.astype(np.int64) * slots_per_day + grid_slots
+    missing = ~np.isin(grid_keys, keys)
+    missing_days, index, missing_counts = np.unique(grid_days[missing], return_index=True, return_counts=True)
+    missing_starts = grid_days[missing].astype("datetime64[s]") + grid_slots[missing] * step
+    result = []
+    for idx, count in zip(index.tolist(), missing_counts.tolist()):
+        if count < min_missing:
+            continue
+        result.append(
+            Gap(
+                start=missing_starts[idx].astype(object),
+                end=missing_starts[idx + count - 1].astype(object),
+                missing=count,
+            )
+        )
+    return result
+
+
+def find_candle_gaps(
+    data: T.Union[list[candles.Candle], candles.CandleColumns],
+    interval: T.Optional[int] = None,
+    calendar: T.Optional[T.Iterable[datetime.date]] = None,
+    min_missing: int = 1,
+) -> list[Gap]:
+    """
+    Find windows of missing candles of one ticker board
+
+    interval -- ISS candle interval of data (1, 10, 60 or 24)
+    calendar -- trading days, see trading_days and weekday_calendar; by default days with candles,
+        so only missing intraday candles are found
+    min_missing -- skip days with fewer missing intraday candles (ISS has no candles
+        for minutes without trades, so raise it for illiquid tickers)
+    """
+    columns = data if isinstance(data, candles.CandleColumns) else candles.CandleColumns.from_candles(data)
+    step = _CANDLE_INTERVALS.get(_DEFAULT_INTERVAL if interval is None else interval)
+    if step is None:
+        raise ValueError(f"Gaps are not supported for interval {interval}")
+    if len(columns) == 0 and calendar is None:
+        return []
+    days = columns.start.astype("datetime64[D]")
+    if step >= datetime.timedelta(days=1):
+        return _date_gaps(days, _calendar(days, calendar))
+    if len(columns) == 0:
+        raise ValueError("Session of intraday candles can't be implied without candles")
+    return _intraday_gaps(columns.start, np.timedelta64(step, "s"), _calendar(days, calendar), min_missing)
+
+
+def find_history_gaps(
+    data: T.Union[list[history.History], history.HistoryColumns],
+    calendar: T.Optional[T.Iterable[datetime.date]] = None,
+) -> list[Gap]:
+    """Find windows of missing dates of calendar (see trading_days and weekday_calendar), dates of data by default"""
+    columns = data if isinstance(data, history.HistoryColumns) else history.HistoryColumns.from_history(data)
+    return _date_gaps(columns.date, _calendar(columns.date, calendar))
+
+
+def _fill(stored: T.Any, fetched: list[T.Any], key: str, columns_type: T.Any) -> T.Any:
+    """Add rows of fetched columns to stored columns, stored rows win on equal key"""
+    merged = columns_type(**{
+        field.name: np.concatenate([getattr(item, field.name) for item in [stored, *fetched]])
+        for field in dataclasses.fields(columns_type)
+    })
+    _, idx = np.unique(getattr(merged, key), return_index=True)
+    return columns_type(**{field.name: getattr(merged, field.name)[idx] for field in dataclasses.fields(columns_type)})
+
+
+def repair_candles(
+    ticker: tickers.Ticker,
+    board: str,
+    data: T.Union[list[candles.Candle], candles.CandleColumns],
+    interval: T.Optional[int] = None,
+    calendar: T.Optional[T.Iterable[datetime.date]] = None,
+    min_missing: int = 1,
+) -> T.Union[list[candles.Candle], candles.CandleColumns]:
+    """
+    Refetch only missing windows of stored candles of ticker board and merge them in
+
+    Makes one request per gap (more for windows longer than an ISS page), result has the same type as data.
+    """
+    columns = data if isinstance(data, candles.CandleColumns) else candles.CandleColumns.from_candles(data)
+    step = _CANDLE_INTERVALS.get(_DEFAULT_INTERVAL if interval is None else interval)
+    fetched = [
+        candles._parse_candles_one_board_columns(
+            ticker,
+            board,
+            start_date=datetime.datetime.combine(gap.start, datetime.time()) if step.days else gap.start,
+            end_date=(
+                datetime.datetime.combine(gap.end, datetime.time(23, 59, 59)) if step.days
+                else gap.end + step - datetime.timedelta(seconds=1)
+            ),
+            interval=interval,
+            use_cache=False,
+        )
+        for gap in find_candle_gaps(columns, interval=interval, calendar=calendar, min_missing=min_missing)
+    ]
+    result = _fill(columns, fetched, "start", candles.CandleColumns)
+    if isinstance(data, candles.CandleColumns):
+        return result
+    return result.to_candles()
+
+
+def repair_history(
+    ticker: tickers.Ticker,
+    data: T.Union[list[history.History], history.HistoryColumns],
+    calendar: T.Optional[T.Iterable[datetime.date]] = None,
+) -> T.Union[list[history.History], history.HistoryColumns]:
+    """Refetch only missing dates of stored history of ticker and merge them in, result has the same type as data"""
+    columns = data if isinstance(data, history.HistoryColumns) else history.HistoryColumns.from_history(data)
+    fetched = [
+        history._parse_history_columns(ticker, start_date=gap.start, end_date=gap.end)
+        for gap in find_history_gaps(columns, calendar=calendar)
+    ]
+    result = _fill(columns, fetched, "date", history.HistoryColumns)
+    if isinstance(data, history.HistoryColumns):
+        return result
+    return result.to_history()
@@ -20,9 +20,11 @@ def _maybe_sum(first, second):
 
 
 def _maybe_mean(first, second):
-    if first is None and second is None:
-        return None
-    return np.mean([item for item in [first, second] if item is not None])
+    if first is None:
+        return second
+    if second is None:
+        return first
+    return (first + second) / 2
 
 
 @dataclasses.dataclass
@@ -75,6 +77,113 @@ class History:
             self.value *= mult
 
 
+@dataclasses.dataclass
+class HistoryColumns:
+    """
+    Columnar history for given ticker
+
+    date -- datetime64[D] array
+    low, high, open, close, mid_price -- float64 arrays
+    numtrades -- int64 array
+    volume, value -- float64 arrays (nan when unknown)
+    """
+    date: np.ndarray
+    low: np.ndarray
+    high: np.ndarray
+    open: np.ndarray
+    close: np.ndarray
+    mid_price: np.ndarray
+    numtrades: np.ndarray
+    volume: np.ndarray
+    value: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.date)
+
+    @classmethod
+    def from_history(cls, history: list[History]) -> "HistoryColumns":
+        return cls(
+            date=np.array([item.date for item in history], dtype="datetime64[D]"),
+            low=np.array([item.low for item in history], dtype=float),
+            high=np.array([item.high for item in history], dtype=float),
+            open=np.array([item.open for item in history], dtype=float),
+            close=np.array([item.close for item in history], dtype=float),
+            mid_price=np.array([item.mid_price for item in history], dtype=float),
+            numtrades=np.array([item.numtrades for item in history], dtype=np.int64),
+            volume=np.array([item.volume for item in history], dtype=float),
+            value=np.array([item.value for item in history], dtype=float),
+        )
+
+    def to_history(self) -> list[History]:
+        return [
+            History(
+                date=date,
+                low=low,
+                high=high,
+                open=open,
+                close=close,
+                mid_price=mid_price,
+                numtrades=numtrades,
+                volume=int(volume) if volume == volume else None,
+                value=value if value == value else None,
+            )
+            for date, low, high, open, close, mid_price, numtrades, volume, value in zip(
+                self.date.astype(object).tolist(),
+                self.low.tolist(),
+                self.high.tolist(),
+                self.open.tolist(),
+                self.close.tolist(),
+                self.mid_price.tolist(),
+                self.numtrades.tolist(),
+                self.volume.tolist(),
+                self.value.tolist(),
+            )
+        ]
+
+
+def _aggregate_history(rows: dict[str, np.ndarray], value_column: str) -> HistoryColumns:
+    """Filter rows without prices, drop repeated (date, board) rows and aggregate boards of one date"""
+    date = rows["TRADEDATE"].astype("datetime64[D]")
+    low = rows["LOW"].astype(float)
+    high = rows["HIGH"].astype(float)
+    open = rows["OPEN"].astype(float)
+    close = rows["CLOSE"].astype(float)
+    prices = np.stack([low, high, open, close])
+    mask = np.all(np.isfinite(prices) & (prices != 0.0), axis=0)
+    _, board_codes = np.unique(rows["BOARDID"].astype(str), return_inverse=True)
+    keys = date.astype(np.int64) * (board_codes.max(initial=0) + 1) + board_codes
+    keys = np.where(mask, keys, -1)
+    _, idx = np.unique(keys, return_index=True)
+    idx = idx[mask[idx]]
+    date = date[idx]
+    low, high, open, close = low[idx], high[idx], open[idx], close[idx]
+    waprice = rows["WAPRICE"][idx].astype(float)
+    mid_price = np.where(np.isfinite(waprice) & (waprice != 0.0), waprice, (low + high + open + close) / 4)
+    numtrades = np.nan_to_num(rows["NUMTRADES"][idx].astype(float)).astype(np.int64)
+    volume = rows["VOLUME"][idx].astype(float)
+    value = rows[value_column][idx].astype(float)
+    if len(date) == 0:
+        return HistoryColumns(date, low, high, open, close, mid_price, numtrades, volume, value)
+    first = np.flatnonzero(np.concatenate([[True], date[1:] != date[:-1]]))
+    counts = np.diff(np.concatenate([first, [len(date)]]))
+
+    def nansum(values: np.ndarray) -> np.ndarray:
+        known = np.add.reduceat(np.isfinite(values), first)
+        return np.where(known > 0, np.add.reduceat(np.nan_to_num(values), first), np.nan)
+
+    return HistoryColumns(
+        date=date[first],
+        low=np.minimum.reduceat(low, first),
+        high=np.maximum.reduceat(high, first),
+        open=np.add.reduceat(open, first) / counts,
+        close=np.add.reduceat(close, first) / counts,
+        mid_price=np.add.reduceat(mid_price, first) / counts,
+        numtrades=np.add.reduceat(numtrades, first),
+        volume=nansum(volume),
+        value=nansum(value),
+    )
+
+
 def _merge_history(first: list[History], second: list[History]) -> list[History]:
     i = 0
     j = 0
@@ -104,59 +213,45 @@ def _merge_history_list(candles: list[list[History]]) -> list[History]:
     return result
 
 
-def _parse_history(
+_HISTORY_COLUMNS = [
+    "TRADEDATE", "BOARDID", "LOW", "HIGH", "OPEN", "CLOSE", "WAPRICE", "NUMTRADES", "VOLUME", "VALUE", "VOLRUR",
+]
+_HISTORY_PARAMS = utils.iss_params({"history": _HISTORY_COLUMNS, "history.cursor": None})
+_HISTORY_PAGE_SIZE = 100
+
+
+def _parse_history_columns(
     ticker: tickers.Ticker,
     start_date: T.Optional[datetime.date] = None,
     end_date: T.Optional[datetime.date] = None,
-) -> list[History]:
-    result: list[History] = []
-    prev_date = start_date
+) -> HistoryColumns:
+    pages: list[dict[str, np.ndarray]] = []
+    start_str = f"from={start_date.isoformat()}" if start_date else ""
+    end_str = f"till={end_date.isoformat()}" if end_date else ""
+    start = 0
     while True:
-        start_str = f"from={start_date.isoformat()}" if start_date else ""
-        end_str = f"till={end_date.isoformat()}" if end_date else ""
-        query = f"?{start_str}&{end_str}"
+        query = f"?{start_str}&{end_str}&limit={_HISTORY_PAGE_SIZE}&start={start}&{_HISTORY_PARAMS}"
         url = f"https://iss.moex.com/iss/history{ticker.market.path}/securities/{ticker.secid}.json{query}"
         response = utils.json_api_call(url)
-        history = utils.prepare_dict(response, "history")
-        boards = []
-        for line in history:
-            date = datetime.date.fromisoformat(line["TRADEDATE"])
-            start_date = date
-            low = line["LOW"]
-            high = line["HIGH"]
-            open = line["OPEN"]
-            close = line["CLOSE"]
-            if low is None or high is None or open is None or close is None:
-                continue
-            if low == 0.0 or high == 0.0 or open == 0.0 or close == 0.0:
-                continue
-            value = line.get("VALUE")
-            if ticker.market == markets.Markets.CURRENCY:
-                value = line.get("VOLRUR")
-            item = History(
-                date=date,
-                low=low,
-                high=high,
-                open=open,
-                close=close,
-                mid_price=line.get('WAPRICE') or np.mean([low, high, open, close]),
-                numtrades=line.get("NUMTRADES") or 0,
-                volume=line.get("VOLUME"),
-                value=value,
-            )
-            board = line["BOARDID"]
-            if len(result) > 0 and result[-1].date == date:
-                if board in boards:
-                    continue
-                boards.append(board)
-                result[-1] = History.merge(result[-1], item)
-            else:
-                boards = [board]
-                result.append(item)
-        if prev_date == start_date:
+        page = utils.prepare_columns(response, "history", _HISTORY_COLUMNS)
+        pages.append(page)
+        cursor = utils.prepare_dict(response, "history.cursor")
+        if len(page["TRADEDATE"]) == 0 or len(cursor) == 0:
             break
-        prev_date = start_date
-    return result
+        start = cursor[0]["INDEX"] + cursor[0]["PAGESIZE"]
+        if start >= cursor[0]["TOTAL"]:
+            break
+    rows = {name: np.concatenate([page[name] for page in pages]) for name in _HISTORY_COLUMNS}
+    value_column = "VOLRUR" if ticker.market == markets.Markets.CURRENCY else "VALUE"
+    return _aggregate_history(rows, value_column)
+
+
+def _parse_history(
+    ticker: tickers.Ticker,
+    start_date: T.Optional[datetime.date] = None,
+    end_date: T.Optional[datetime.date] = None,
+) -> list[History]:
+    return _parse_history_columns(ticker, start_date=start_date, end_date=end_date).to_history()
 
 
 def get_history(
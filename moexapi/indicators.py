@@ -0,0 +1,261 @@
+import typing as T
+
+import numpy as np
+
+from . import candles
+from . import history
+
+
+Bars = T.Union[list[candles.Candle], list[history.History], candles.CandleColumns, history.HistoryColumns]
+Values = T.Union[Bars, np.ndarray]
+
+
+def _bars(data: Bars) -> T.Union[candles.CandleColumns, history.HistoryColumns]:
+    if isinstance(data, (candles.CandleColumns, history.HistoryColumns)):
+        return data
+    if len(data) > 0 and isinstance(data[0], history.History):
+        return history.HistoryColumns.from_history(data)
+    if isinstance(data, list):
+        return candles.CandleColumns.from_candles(data)
+    raise TypeError(f"Expected candles or history, got {type(data).__name__}")
+
+
+def _close(data: Values) -> np.ndarray:
+    if isinstance(data, np.ndarray):
+        return data.astype(float)
+    return _bars(data).close
+
+
+def _ema(values: np.ndarray, alpha: float, prev: float) -> np.ndarray:
+    """
+    y[i] = (1 - alpha) * y[i - 1] + alpha * values[i] with y[-1] = prev
+
+    Inside a chunk y[i] = decay^(i+1) * prev + alpha * decay^i * cumsum(values / decay^j),
+    chunks are short enough for decay^-j to stay far from float overflow.
+    """
+    if alpha == 1.0:
+        return values.astype(float)
+    decay = 1.0 - alpha
+    result = np.empty(len(values))
+    chunk = max(1, min(len(values), int(200 / -np.log10(decay))))
+    powers = decay ** np.arange(chunk)
+    for begin in range(0, len(values), chunk):
+        x = values[begin:begin + chunk]
+        p = powers[:len(x)]
+        result[begin:begin + len(x)] = decay * p * prev + alpha * p * np.cumsum(x / p)
+        prev = result[begin + len(x) - 1]
+    return result
+
+
+class _Wilder:
+    """Wilder smoothing (alpha = 1 / window) seeded with simple mean of first window values"""
+    def __init__(self, window: int):
+        self.window = window
+        self._pending = np.empty(0)
+        self._value: T.Optional[float] = None
+
+    def update(self, values: np.ndarray) -> np.ndarray:
+        if self._value is not None:
+            result = _ema(values, 1 / self.window, self._value)
+        else:
+            count = len(values)
+            values = np.concatenate([self._pending, values])
+            if len(values) < self.window:
+                self._pending = values
+                return np.full(count, np.nan)
+            seed = values[:self.window].mean()
+            smoothed = _ema(values[self.window:], 1 / self.window, seed)
+            result = np.concatenate([np.full(self.window - 1, np.nan), [seed], smoothed])[len(values) - count:]
+            self._pending = np.empty(0)
+        if len(result) > 0:
+            self._value = result[-1]
+        return result
+
+
+def _rolling_sum(tail: np.ndarray, values: np.ndarray, window: int) -> tuple[np.ndarray, np.ndarray]:
+    """Sums of last window values for every new value (nan until window values are known) and the next tail"""
+    values = np.concatenate([tail, values])
+    sums = np.cumsum(np.concatenate([[0.0], values]))
+    result = np.full(len(values), np.nan)
+    if len(values) >= window:
+        result[window - 1:] = sums[window:] - sums[:len(sums) - window]
+    return result[len(tail):], values[max(0, len(values) - window + 1):]
+
+
+class SMA:
+    """
+    Simple moving average of close over window bars
+
+    update() takes new bars (or close values) and returns indicator values for them,
+    so appending bars costs O(new bars + window) instead of a full recompute.
+    """
+    def __init__(self, window: int):
+        assert window > 0, f"Wrong window {window}"
+        self.window = window
+        self._tail = np.empty(0)
+
+    def update(self, data: Values) -> np.ndarray:
+        sums, self._tail = _rolling_sum(self._tail, _close(data), self.window)
+        return sums / self.window
+
+
+class EMA:
+    """Exponential moving average of close with alpha = 2 / (span + 1), seeded with the first close"""
+    def __init__(self, span: T.Optional[float] = None, alpha: T.Optional[float] = None):
+        assert (span is None) != (alpha is None), "Set exactly one of span and alpha"
+        self.alpha = alpha if alpha is not None else 2 / (span + 1)
+        assert 0 < self.alpha <= 1, f"Wrong alpha {self.alpha}"
+        self._value: T.Optional[float] = None
+
+    def update(self, data: Values) -> np.ndarray:
+        close = _close(data)
+        if len(close) == 0:
+            return close
+        result = _ema(close, self.alpha, close[0] if self._value is None else self._value)
+        self._value = result[-1]
+        return result
+
+
+class RSI:
+    """Relative strength index of close with Wilder smoothing of gains and losses"""
+    def __init__(self, window: int = 14):
+        self.window = window
+        self._prev_close: T.Optional[float] = None
+        self._gain = _Wilder(window)
+        self._loss = _Wilder(window)
+
+    def update(self, data: Values) -> np.ndarray:
+        close = _close(data)
+        if len(close) == 0:
+            return close
+        if self._prev_close is None:
+            deltas = np.diff(close)
+            lead = [np.nan]
+        else:
+            deltas = np.diff(np.concatenate([[self._prev_close], close]))
+            lead = []
+        self._prev_close = close[-1]
+        gain = self._gain.update(np.maximum(deltas, 0.0))
+        loss = self._loss.update(np.maximum(-deltas, 0.0))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsi = np.where(loss == 0.0, np.where(gain == 0.0, 50.0, 100.0), 100.0 - 100.0 / (1.0 + gain / loss))
+        return np.concatenate([lead, rsi])
+
+
+class ATR:
+    """Average true range of candles or history with Wilder smoothing"""
+    def __init__(self, window: int = 14):
+        self.window = window
+        self._prev_close = np.nan
+        self._true_range = _Wilder(window)
+
+    def update(self, data: Bars) -> np.ndarray:
+        bars = _bars(data)
+        if len(bars) == 0:
+            return np.empty(0)
+        prev_close = np.concatenate([[self._prev_close], bars.close[:-1]])
+        self._prev_close = bars.close[-1]
+        # fmax ignores unknown previous close of the first bar
+        true_range = np.fmax(bars.high - bars.low, np.fmax(np.abs(bars.high - prev_close), np.abs(bars.low - prev_close)))
+        return self._true_range.update(true_range)
+
+
+class VWAP:
+    """
+    Volume weighted average price (value / volume)
+
+    window=None accumulates from the start of every day for candles (session VWAP)
+    and from the first bar for history, otherwise sums go over last window bars.
+    """
+    def __init__(self, window: T.Optional[int] = None):
+        self.window = window
+        self._value_tail = np.empty(0)
+        self._volume_tail = np.empty(0)
+        self._day: T.Optional[int] = None
+        self._value_sum = 0.0
+        self._volume_sum = 0.0
+
+    def update(self, data: Bars) -> np.ndarray:
+        bars = _bars(data)
+        value = np.nan_to_num(bars.value)
+        volume = np.nan_to_num(bars.volume)
+        if len(bars) == 0:
+            return np.empty(0)
+        if self.window is not None:
+            value_sum, self._value_tail = _rolling_sum(self._value_tail, value, self.window)
+            volume_sum, self._volume_tail = _rolling_sum(self._volume_tail, volume, self.window)
+        else:
+            if isinstance(bars, candles.CandleColumns):
+                days = bars.start.astype("datetime64[D]").astype(np.int64)
+            else:
+                days = np.zeros(len(bars), dtype=np.int64)
+            first = np.flatnonzero(np.concatenate([[True], days[1:] != days[:-1]]))
+            segment = np.repeat(first, np.diff(np.concatenate([first, [len(days)]])))
+            value_sum = np.cumsum(value)
+            volume_sum = np.cumsum(volume)
+            value_sum = value_sum - value_sum[segment] + value[segment]
+            volume_sum = volume_sum - volume_sum[segment] + volume[segment]
+            if days[0] == self._day:
+                value_sum[segment == 0] += self._value_sum
+                volume_sum[segment == 0] += self._volume_sum
+            self._day = days[-1]
+            self._value_sum = value_sum[-1]
+            self._volume_sum = volume_sum[-1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(volume_sum > 0, value_sum / volume_sum, np.nan)
+
+
+class Volatility:
+    """Rolling standard deviation of close log returns over window returns, annualized when periods_per_year is set"""
+    def __init__(self, window: int = 20, periods_per_year: T.Optional[float] = None):
+        assert window > 1, f"Wrong window {window}"
+        self.window = window
+        self.periods_per_year = periods_per_year
+        self._prev_close: T.Optional[float] = None
+        self._tail = np.empty(0)
+
+    def update(self, data: Values) -> np.ndarray:
+        close = _close(data)
+        if len(close) == 0:
+            return close
+        if self._prev_close is None:
+            returns = np.diff(np.log(close))
+            lead = [np.nan]
+        else:
+            returns = np.diff(np.log(np.concatenate([[self._prev_close], close])))
+            lead = []
+        self._prev_close = close[-1]
+        # variance doesn't depend on shift, which keeps sums of squares small
+        values = np.concatenate([self._tail, returns])
+        shift = values.mean() if len(values) > 0 else 0.0
+        sums, _ = _rolling_sum(self._tail - shift, returns - shift, self.window)
+        squares, _ = _rolling_sum((self._tail - shift) ** 2, (returns - shift) ** 2, self.window)
+        self._tail = values[max(0, len(values) - self.window + 1):]
+        std = np.sqrt(np.maximum(squares - sums ** 2 / self.window, 0.0) / (self.window - 1))
+        if self.periods_per_year is not None:
+            std *= np.sqrt(self.periods_per_year)
+        return np.concatenate([lead, std])
+
+
+def sma(data: Values, window: int) -> np.ndarray:
+    return SMA(window).update(data)
+
+
+def ema(data: Values, span: T.Optional[float] = None, alpha: T.Optional[float] = None) -> np.ndarray:
+    return EMA(span=span, alpha=alpha).update(data)
+
+
+def rsi(data: Values, window: int = 14) -> np.ndarray:
+    return RSI(window).update(data)
+
+
+def atr(data: Bars, window: int = 14) -> np.ndarray:
+    return ATR(window).update(data)
+
+
+def vwap(data: Bars, window: T.Optional[int] = None) -> np.ndarray:
+    return VWAP(window).update(data)
+
+
+def volatility(data: Values, window: int = 20, periods_per_year: T.Optional[float] = None) -> np.ndarray:
+    return Volatility(window, periods_per_year=periods_per_year).update(data)
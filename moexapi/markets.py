@@ -119,3 +119,11 @@ class Markets:
     COMPANY_BONDS = _COMPANY_BONDS
     INDEX = _INDEX
     CURRENCY = _CURRENCY
+
+
+def get_market(name: str) -> Market:
+    """Find market by its name ("federal bonds") or Markets attribute name ("FEDERAL_BONDS")"""
+    for attr, market in vars(Markets).items():
+        if isinstance(market, Market) and name in [str(market), attr, attr.lower()]:
+            return market
+    raise KeyError(f"Unknown market {name}")
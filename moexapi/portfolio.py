@@ -0,0 +1,117 @@
+import typing as T
+
+import concurrent.futures
+import dataclasses
+import datetime
+
+import numpy as np
+
+from . import bonds
+from . import history
+from . import markets
+from . import tickers
+
+
+# currency -> secid of its TOM instrument on CETS board
+_CURRENCY_SECIDS = {
+    "USD": "USD000UTSTOM",
+    "EUR": "EUR_RUB__TOM",
+    "CNY": "CNYRUB_TOM",
+}
+_LOOKBACK = datetime.timedelta(days=14)
+
+
+@dataclasses.dataclass
+class Position:
+    """
+    quantity -- number of securities, a number or an array with value for every valuation date;
+        history is split-adjusted, so quantity is in units after the latest split
+    """
+    ticker: tickers.Ticker
+    quantity: T.Union[float, np.ndarray]
+
+
+@dataclasses.dataclass
+class NAV:
+    """
+    Portfolio value on dates
+
+    dates -- datetime64[D] array of valuation dates
+    prices -- len(dates) x len(secids) prices of one security in RUB (with accrued interest for bonds),
+        nan before the first known close
+    values -- prices multiplied by quantities
+    nav -- sum of known values for every date
+    """
+    dates: np.ndarray
+    secids: list[str]
+    prices: np.ndarray
+    values: np.ndarray
+    nav: np.ndarray
+
+
+def _last_close(columns: history.HistoryColumns, dates: np.ndarray) -> np.ndarray:
+    """Close of the last trading day not after every date"""
+    idx = np.searchsorted(columns.date, dates, side="right") - 1
+    return np.where(idx >= 0, columns.close[np.maximum(idx, 0)], np.nan)
+
+
+def _currency_ticker(currency: str) -> tickers.Ticker:
+    return tickers.get_ticker(_CURRENCY_SECIDS.get(currency, currency), market=markets.Markets.CURRENCY)
+
+
+def value_portfolio(
+    positions: list[Position],
+    dates: T.Union[T.Sequence[datetime.date], np.ndarray],
+    max_workers: T.Optional[int] = None,
+    lookback: datetime.timedelta = _LOOKBACK,
+) -> NAV:
+    """
+    Value positions in RUB on every date
+
+    History of every security, schedules of bonds and rates of currencies are loaded once
+    and concurrently, prices are forward-filled from the last trading day (up to lookback
+    before the first date). Bond price is close percent of outstanding face value
+    plus accrued interest on the date.
+    """
+    dates = np.unique(np.asarray(dates, dtype="datetime64[D]"))
+    start_date = (dates[0] - np.timedelta64(lookback.days, "D")).astype(object)
+    end_date = dates[-1].astype(object)
+    ticker_list = list({(position.ticker.secid, position.ticker.market): position.ticker for position in positions}.values())
+    bond_list = [ticker for ticker in ticker_list if markets.Markets.BONDS.has(ticker.market)]
+    currencies = sorted({ticker.currency for ticker in ticker_list if ticker.currency not in [None, "RUB"]})
+
+    def load_history(ticker: tickers.Ticker) -> history.HistoryColumns:
+        return history.HistoryColumns.from_history(
+            history.get_history(ticker, start_date=start_date, end_date=end_date)
+        )
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        histories = executor.map(load_history, ticker_list)
+        bond_futures = [executor.submit(bonds.Bond, ticker) for ticker in bond_list]
+        rate_histories = executor.map(load_history, [_currency_ticker(currency) for currency in currencies])
+        closes = {
+            (ticker.secid, ticker.market): _last_close(columns, dates)
+            for ticker, columns in zip(ticker_list, histories)
+        }
+        rates = {currency: _last_close(columns, dates) for currency, columns in zip(currencies, rate_histories)}
+        schedules = {(ticker.secid, ticker.market): future.result() for ticker, future in zip(bond_list, bond_futures)}
+
+    prices = np.empty((len(dates), len(positions)))
+    values = np.empty((len(dates), len(positions)))
+    for idx, position in enumerate(positions):
+        key = (position.ticker.secid, position.ticker.market)
+        price = closes[key]
+        if key in schedules:
+            bond = schedules[key]
+            price = price / 100 * bond.outstanding_face(dates) + bond.accrued_interest(dates)
+        if position.ticker.currency in rates:
+            price = price * rates[position.ticker.currency]
+        prices[:, idx] = price
+        values[:, idx] = price * np.broadcast_to(np.asarray(position.quantity, dtype=float), len(dates))
+    return NAV(
+        dates=dates,
+        secids=[position.ticker.secid for position in positions],
+        prices=prices,
+        values=values,
+        nav=np.nansum(values, axis=1),
+    )
@@ -0,0 +1,287 @@
+import typing as T
+
+import contextlib
+import json
+import re
+import socket
+import socketserver
+import threading
+import time
+import uuid
+import zlib
+
+from . import utils
+
+
+logger = utils.initialize_logging(__file__)
+
+
+# first matching url pattern gives time to live of cached response in seconds
+_DEFAULT_TTLS = [
+    # changeovers are under /iss/history, so they go before history
+    (re.compile(r"changeover|splits"), 24 * 60 * 60),
+    (re.compile(r"/iss/history/"), 60 * 60),
+    # candles and current prices of engine/market securities
+    (re.compile(r"/candles\.json|/iss/engines/[^?]*/securities"), 60),
+    # listings, descriptions, bondization and dividends are all under /iss/securities
+    (re.compile(r"/iss/securities"), 24 * 60 * 60),
+]
+_DEFAULT_TTL = 10 * 60
+_LOCK_TIMEOUT = 30
+_LOCK_POLL = 0.05
+# deletes lock only if it still holds our token, GET and DEL as two commands could delete a lock of another node
+_UNLOCK_SCRIPT = 'if redis.call("GET", KEYS[1]) == ARGV[1] then return redis.call("DEL", KEYS[1]) else return 0 end'
+
+
+class RedisError(Exception):
+    """Error reply of Redis server"""
+
+
+def _encode(args: T.Sequence[T.Union[str, bytes, int]]) -> bytes:
+    parts = [f"*{len(args)}\r\n".encode()]
+    for arg in args:
+        if not isinstance(arg, bytes):
+            arg = str(arg).encode()
+        parts.append(f"${len(arg)}\r\n".encode() + arg + b"\r\n")
+    return b"".join(parts)
+
+
+def _read_reply(stream: T.BinaryIO) -> T.Any:
+    line = stream.readline()
+    if not line.endswith(b"\r\n"):
+        raise ConnectionError("Connection closed by Redis server")
+    kind, payload = line[:1], line[1:-2]
+    if kind == b"+":
+        return payload.decode()
+    if kind == b"-":
+        raise RedisError(payload.decode())
+    if kind == b":":
+        return int(payload)
+    if kind == b"$":
+        size = int(payload)
+        if size < 0:
+            return None
+        data = stream.read(size + 2)
+        if len(data) != size + 2:
+            raise ConnectionError("Connection closed by Redis server")
+        return data[:-2]
+    if kind == b"*":
+        size = int(payload)
+        return None if size < 0 else [_read_reply(stream) for _ in range(size)]
+    raise RedisError(f"Unknown reply {line!r}")
+
+
+class RedisClient:
+    """Minimal thread-safe client of Redis protocol (RESP2) over one connection"""
+    def __init__(self, host: str = "localhost", port: int = 6379, timeout: float = 5.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._socket: T.Optional[socket.socket] = None
+        self._stream: T.Optional[T.BinaryIO] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> None:
+        self._socket = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._stream = self._socket.makefile("rb")
+
+    def close(self) -> None:
+        with self._lock:
+            self._close()
+
+    def _close(self) -> None:
+        if self._socket is not None:
+            self._stream.close()
+            self._socket.close()
+        self._socket = None
+        self._stream = None
+
+    def execute(self, *args: T.Union[str, bytes, int]) -> T.Any:
+        """Send command and return its reply, connection is reopened after network errors"""
+        with self._lock:
+            try:
+                if self._socket is None:
+                    self._connect()
+                self._socket.sendall(_encode(args))
+                return _read_reply(self._stream)
+            except OSError:
+                self._close()
+                raise
+
+    def ping(self) -> bool:
+        return self.execute("PING") == "PONG"
+
+    def get(self, key: str) -> T.Optional[bytes]:
+        return self.execute("GET", key)
+
+    def set(self, key: str, value: bytes, px: T.Optional[int] = None, nx: bool = False) -> bool:
+        """SET key value [PX milliseconds] [NX], False if NX prevented setting"""
+        args: list[T.Union[str, bytes, int]] = ["SET", key, value]
+        if px is not None:
+            args.extend(["PX", px])
+        if nx:
+            args.append("NX")
+        return self.execute(*args) == "OK"
+
+    def delete(self, *keys: str) -> int:
+        return self.execute("DEL", *keys)
+
+    def eval(self, script: str, keys: T.Sequence[str], args: T.Sequence[T.Union[str, bytes, int]]) -> T.Any:
+        return self.execute("EVAL", script, len(keys), *keys, *args)
+
+
+class RedisCache:
+    """
+    Response cache in Redis shared by all nodes, install it with utils.set_cache_backend(RedisCache(client))
+
+    Values are zlib compressed json, time to live depends on url (see _DEFAULT_TTLS).
+    lock() is SET NX PX lock, so every url is fetched from ISS by one node per freshness window
+    while the others wait for its response. Unavailable Redis only disables sharing.
+    """
+    def __init__(
+        self,
+        client: RedisClient,
+        prefix: str = "moexapi:",
+        ttls: T.Optional[list[tuple[re.Pattern, float]]] = None,
+        default_ttl: float = _DEFAULT_TTL,
+        lock_timeout: float = _LOCK_TIMEOUT,
+    ):
+        self.client = client
+        self.prefix = prefix
+        self.ttls = _DEFAULT_TTLS if ttls is None else ttls
+        self.default_ttl = default_ttl
+        self.lock_timeout = lock_timeout
+
+    def ttl(self, url: str) -> float:
+        for pattern, ttl in self.ttls:
+            if pattern.search(url):
+                return ttl
+        return self.default_ttl
+
+    def get(self, url: str) -> T.Any:
+        try:
+            value = self.client.get(f"{self.prefix}{url}")
+        except (OSError, RedisError) as ex:
+            logger.warning(f"Redis get of {url} failed: {ex!r}")
+            return None
+        if value is None:
+            return None
+        try:
+            return json.loads(zlib.decompress(value))
+        except (zlib.error, ValueError) as ex:
+            logger.warning(f"Corrupted Redis value of {url}: {ex!r}")
+            return None
+
+    def set(self, url: str, result: T.Any) -> None:
+        value = zlib.compress(json.dumps(result, ensure_ascii=False).encode())
+        try:
+            self.client.set(f"{self.prefix}{url}", value, px=int(self.ttl(url) * 1000))
+        except (OSError, RedisError) as ex:
+            logger.warning(f"Redis set of {url} failed: {ex!r}")
+
+    @contextlib.contextmanager
+    def lock(self, url: str) -> T.Iterator[None]:
+        """Wait till lock of url is free (or lock_timeout passes) and hold it"""
+        key = f"{self.prefix}lock:{url}"
+        token = uuid.uuid4().hex.encode()
+        timeout = int(self.lock_timeout * 1000)
+        deadline = time.monotonic() + self.lock_timeout
+        acquired = False
+        try:
+            while not acquired and time.monotonic() < deadline:
+                acquired = self.client.set(key, token, px=timeout, nx=True)
+                if not acquired:
+                    time.sleep(_LOCK_POLL)
+        except (OSError, RedisError) as ex:
+            logger.warning(f"Redis lock of {url} failed: {ex!r}")
+        try:
+            yield
+        finally:
+            if acquired:
+                try:
+                    # lock may have expired and been taken by another node
+                    self.client.eval(_UNLOCK_SCRIPT, [key], [token])
+                except (OSError, RedisError) as ex:
+                    logger.warning(f"Redis unlock of {url} failed: {ex!r}")
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        while True:
+            try:
+                command = _read_reply(self.rfile)
+            except (ConnectionError, OSError):
+                return
+            self.wfile.write(self.server.execute(command))
+
+
+class LocalRedisServer(socketserver.ThreadingTCPServer):
+    """
+    In-process stand-in of Redis server for tests and single-machine runs
+
+    Supports PING, GET, SET with EX/PX/NX, DEL, FLUSHALL and EVAL of the unlock script only.
+    Use as context manager, port=0 picks a free port.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _Handler)
+        self._data: dict[bytes, tuple[bytes, T.Optional[float]]] = {}
+        self._data_lock = threading.Lock()
+        self._thread: T.Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def _get(self, key: bytes) -> T.Optional[bytes]:
+        value, expire_at = self._data.get(key, (None, None))
+        if expire_at is not None and expire_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    def execute(self, command: list[bytes]) -> bytes:
+        name = command[0].upper()
+        with self._data_lock:
+            if name == b"PING":
+                return b"+PONG\r\n"
+            if name == b"GET" and len(command) == 2:
+                value = self._get(command[1])
+                return b"$-1\r\n" if value is None else f"${len(value)}\r\n".encode() + value + b"\r\n"
+            if name == b"SET" and len(command) >= 3:
+                expire_at = None
+                options = [item.upper() for item in command[3:]]
+                for option, argument in zip(options, command[4:] + [b""]):
+                    if option == b"PX":
+                        expire_at = time.monotonic() + int(argument) / 1000
+                    elif option == b"EX":
+                        expire_at = time.monotonic() + int(argument)
+                if b"NX" in options and self._get(command[1]) is not None:
+                    return b"$-1\r\n"
+                self._data[command[1]] = (command[2], expire_at)
+                return b"+OK\r\n"
+            if name == b"DEL":
+                deleted = sum(self._get(key) is not None for key in command[1:])
+                for key in command[1:]:
+                    self._data.pop(key, None)
+                return f":{deleted}\r\n".encode()
+            if name == b"EVAL" and command[1:3] == [_UNLOCK_SCRIPT.encode(), b"1"] and len(command) == 5:
+                if self._get(command[3]) != command[4]:
+                    return b":0\r\n"
+                del self._data[command[3]]
+                return b":1\r\n"
+            if name == b"FLUSHALL":
+                self._data.clear()
+                return b"+OK\r\n"
+        return f"-ERR unknown command '{command[0].decode()}'\r\n".encode()
+
+    def __enter__(self) -> "LocalRedisServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args: T.Any) -> None:
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,135 @@
+import typing as T
+
+import concurrent.futures
+import dataclasses
+import datetime
+
+import numpy as np
+
+from . import history
+from . import tickers
+from . import utils
+
+
+logger = utils.initialize_logging(__file__)
+
+
+_CHUNK = 1024
+
+
+@dataclasses.dataclass
+class Returns:
+    """
+    Daily log returns of tickers on a common calendar
+
+    dates -- datetime64[D] array, union of trading dates of all tickers
+    values -- len(dates) x len(secids) float64 array, nan when ticker has no close
+        on the date or on the previous calendar date
+    """
+    secids: list[str]
+    dates: np.ndarray
+    values: np.ndarray
+
+
+def get_returns(
+    ticker_list: list[tickers.Ticker],
+    start_date: T.Optional[datetime.date] = None,
+    end_date: T.Optional[datetime.date] = None,
+    max_workers: T.Optional[int] = None,
+) -> Returns:
+    """Load split-adjusted history of tickers concurrently and compute log returns of close"""
+    def load(ticker: tickers.Ticker) -> history.HistoryColumns:
+        return history.HistoryColumns.from_history(
+            history.get_history(ticker, start_date=start_date, end_date=end_date)
+        )
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        columns = list(executor.map(load, ticker_list))
+    dates = np.unique(np.concatenate([item.date for item in columns] + [np.empty(0, dtype="datetime64[D]")]))
+    close = np.full((len(dates), len(columns)), np.nan)
+    for idx, item in enumerate(columns):
+        close[np.searchsorted(dates, item.date), idx] = item.close
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = np.log(close[1:] / close[:-1])
+    return Returns(secids=[ticker.secid for ticker in ticker_list], dates=dates[1:], values=values)
+
+
+def _pairwise_sums(values: np.ndarray, chunk: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Sums over rows where both columns are known, accumulated by chunks of rows
+
+    Returns counts[i, j], sums[i, j] of column i and products[i, j] of columns i and j.
+    """
+    size = values.shape[1]
+    counts = np.zeros((size, size))
+    sums = np.zeros((size, size))
+    products = np.zeros((size, size))
+    for begin in range(0, len(values), chunk):
+        part = values[begin:begin + chunk]
+        known = np.isfinite(part).astype(float)
+        part = np.where(known > 0, part, 0.0)
+        counts += known.T @ known
+        sums += part.T @ known
+        products += part.T @ part
+    return counts, sums, products
+
+
+def _ledoit_wolf(values: np.ndarray, means: np.ndarray, cov: np.ndarray, chunk: int) -> np.ndarray:
+    """
+    Shrink cov towards scaled identity with Ledoit-Wolf (2004) intensity
+
+    Unknown returns are taken equal to the column mean (zero after centering),
+    pairs without covariance keep nan.
+    """
+    size = cov.shape[0]
+    known_cov = np.where(np.isfinite(cov), cov, 0.0)
+    mu = np.trace(known_cov) / size
+    target = mu * np.eye(size)
+    d2 = np.sum((known_cov - target) ** 2)
+    if d2 == 0.0:
+        return cov
+    # sum over rows of ||x x' - S||^2 = sum (x'x)^2 - 2 x'Sx + ||S||^2
+    total = 0.0
+    for begin in range(0, len(values), chunk):
+        part = np.nan_to_num(values[begin:begin + chunk] - means)
+        total += np.sum(np.sum(part ** 2, axis=1) ** 2) - 2 * np.sum((part @ known_cov) * part)
+    rows = len(values)
+    total += rows * np.sum(known_cov ** 2)
+    b2 = min(total / rows ** 2, d2) if rows else d2
+    intensity = b2 / d2
+    logger.debug(f"Ledoit-Wolf shrinkage intensity {intensity:.3f}")
+    return intensity * target + (1 - intensity) * cov
+
+
+def covariance(
+    returns: T.Union[Returns, np.ndarray],
+    min_periods: int = 2,
+    shrinkage: bool = True,
+    chunk: int = _CHUNK,
+) -> np.ndarray:
+    """
+    Covariance matrix of returns with pairwise handling of unknown values
+
+    Every pair uses the rows where both tickers have returns, pairs with fewer than min_periods
+    such rows are nan. Rows are processed by chunks, so memory is bounded by chunk x tickers
+    plus a few tickers x tickers matrices. With shrinkage the matrix is shrunk with Ledoit-Wolf.
+    """
+    values = returns.values if isinstance(returns, Returns) else np.asarray(returns, dtype=float)
+    counts, sums, products = _pairwise_sums(values, chunk)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = (products - sums * sums.T / counts) / (counts - 1)
+    cov[counts < max(min_periods, 2)] = np.nan
+    if shrinkage:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            means = np.nan_to_num(np.diag(sums) / np.diag(counts))
+        cov = _ledoit_wolf(values, means, cov, chunk)
+    return cov
+
+
+def correlation(cov: np.ndarray) -> np.ndarray:
+    """Correlation matrix from covariance matrix"""
+    std = np.sqrt(np.diag(cov))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = cov / np.outer(std, std)
+    np.fill_diagonal(result, np.where(std > 0, 1.0, np.nan))
+    return result
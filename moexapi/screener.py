@@ -0,0 +1,193 @@
+import typing as T
+
+import concurrent.futures
+import dataclasses
+import datetime
+import os
+import time
+
+import numpy as np
+
+from . import markets
+from . import tickers
+from . import utils
+
+
+_BOND_PARAMS = utils.iss_params({
+    "securities": [
+        "SECID", "BOARDID", "SHORTNAME", "ISIN", "FACEUNIT", "FACEVALUE", "COUPONPERCENT", "COUPONVALUE",
+        "NEXTCOUPON", "MATDATE", "OFFERDATE", "ACCRUEDINT", "PREVPRICE",
+    ],
+    "marketdata": ["LAST", "YIELD", "DURATION"],
+})
+
+# parameters of cached universe saved next to its columns
+_MARKET = "_market"
+_WITH_DETAILS = "_with_details"
+
+
+def _to_date(values: list[T.Optional[str]]) -> np.ndarray:
+    return np.array(
+        ["NaT" if value is None or value.startswith("0000") else value for value in values],
+        dtype="datetime64[D]",
+    )
+
+
+@dataclasses.dataclass
+class BondUniverse:
+    """
+    Bonds of market as columns for fast screening
+
+    Dates are datetime64[D] arrays (NaT when unknown), numbers are float64 arrays (nan when unknown).
+    price is in percent of face value, yield_percent is yield to maturity (or offer) in percent.
+    is_qualified_investors and early_repayment are False unless loaded with details.
+    """
+    secid: np.ndarray
+    board: np.ndarray
+    shortname: np.ndarray
+    isin: np.ndarray
+    currency: np.ndarray
+    face_value: np.ndarray
+    coupon_percent: np.ndarray
+    coupon_value: np.ndarray
+    accrued_interest: np.ndarray
+    price: np.ndarray
+    yield_percent: np.ndarray
+    duration: np.ndarray
+    next_coupon: np.ndarray
+    mat_date: np.ndarray
+    offer_date: np.ndarray
+    is_qualified_investors: np.ndarray
+    early_repayment: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.secid)
+
+    @classmethod
+    def from_iss(cls, market: markets.Market = markets.Markets.BONDS, with_details: bool = False) -> "BondUniverse":
+        """Load board securities of market with one request per board, details need one request per bond"""
+        securities: list[dict[str, T.Any]] = []
+        marketdata: list[dict[str, T.Any]] = []
+        for child_market in market.childs():
+            for board in sorted(child_market.boards):
+                response = utils.json_api_call(
+                    f"https://iss.moex.com/iss{child_market.path}/boards/{board}/securities.json?{_BOND_PARAMS}"
+                )
+                securities.extend(utils.prepare_dict(response, "securities"))
+                marketdata.extend(utils.prepare_dict(response, "marketdata"))
+        assert len(securities) == len(marketdata)
+        price = np.array([line.get("LAST") for line in marketdata], dtype=float)
+        prev_price = np.array([line.get("PREVPRICE") for line in securities], dtype=float)
+        result = cls(
+            secid=np.array([line["SECID"] for line in securities], dtype=str),
+            board=np.array([line["BOARDID"] for line in securities], dtype=str),
+            shortname=np.array([line.get("SHORTNAME") or "" for line in securities], dtype=str),
+            isin=np.array([line.get("ISIN") or "" for line in securities], dtype=str),
+            currency=np.array([tickers._sur_to_rub(line.get("FACEUNIT")) or "" for line in securities], dtype=str),
+            face_value=np.array([line.get("FACEVALUE") for line in securities], dtype=float),
+            coupon_percent=np.array([line.get("COUPONPERCENT") for line in securities], dtype=float),
+            coupon_value=np.array([line.get("COUPONVALUE") for line in securities], dtype=float),
+            accrued_interest=np.array([line.get("ACCRUEDINT") for line in securities], dtype=float),
+            price=np.where(np.isnan(price), prev_price, price),
+            yield_percent=np.array([line.get("YIELD") for line in marketdata], dtype=float),
+            duration=np.array([line.get("DURATION") for line in marketdata], dtype=float),
+            next_coupon=_to_date([line.get("NEXTCOUPON") for line in securities]),
+            mat_date=_to_date([line.get("MATDATE") for line in securities]),
+            offer_date=_to_date([line.get("OFFERDATE") for line in securities]),
+            is_qualified_investors=np.zeros(len(securities), dtype=bool),
+            early_repayment=np.zeros(len(securities), dtype=bool),
+        )
+        if with_details:
+            with concurrent.futures.ThreadPoolExecutor() as executor:
+                details = list(executor.map(tickers.get_ticker_info_dict, result.secid.tolist()))
+            result.is_qualified_investors = np.array(
+                [bool(int(info.get("ISQUALIFIEDINVESTORS") or 0)) for info in details],
+                dtype=bool,
+            )
+            result.early_repayment = np.array([bool(int(info.get("EARLYREPAYMENT") or 0)) for info in details], dtype=bool)
+        return result
+
+    @classmethod
+    def load(
+        cls,
+        path: T.Optional[str] = None,
+        market: markets.Market = markets.Markets.BONDS,
+        with_details: bool = False,
+        max_age: datetime.timedelta = datetime.timedelta(hours=1),
+    ) -> "BondUniverse":
+        """
+        Read universe from .npz cache at path if it is fresher than max_age, otherwise load and save it
+
+        Cache is used only if it was saved for the same market and with details when they are requested.
+        """
+        if path is not None and os.path.exists(path) and time.time() - os.path.getmtime(path) < max_age.total_seconds():
+            with np.load(path) as data:
+                if (
+                    _MARKET in data.files
+                    and str(data[_MARKET]) == str(market)
+                    and (bool(data[_WITH_DETAILS]) or not with_details)
+                ):
+                    return cls(**{field.name: data[field.name] for field in dataclasses.fields(cls)})
+        result = cls.from_iss(market=market, with_details=with_details)
+        if path is not None:
+            with open(f"{path}.tmp", "wb") as f:
+                np.savez_compressed(
+                    f,
+                    **dataclasses.asdict(result),
+                    **{_MARKET: np.array(str(market)), _WITH_DETAILS: np.array(with_details)},
+                )
+            os.replace(f"{path}.tmp", path)
+        return result
+
+    def filter(self, mask: np.ndarray) -> "BondUniverse":
+        """Bonds where mask (boolean or index array) is set"""
+        return BondUniverse(**{field.name: getattr(self, field.name)[mask] for field in dataclasses.fields(self)})
+
+    def screen(
+        self,
+        mat_date_from: T.Optional[datetime.date] = None,
+        mat_date_till: T.Optional[datetime.date] = None,
+        min_coupon_percent: T.Optional[float] = None,
+        max_coupon_percent: T.Optional[float] = None,
+        min_yield: T.Optional[float] = None,
+        max_yield: T.Optional[float] = None,
+        offer_date_till: T.Optional[datetime.date] = None,
+        without_offers: bool = False,
+        currency: T.Optional[str] = None,
+        for_qualified_investors: T.Optional[bool] = None,
+        early_repayment: T.Optional[bool] = None,
+    ) -> "BondUniverse":
+        """Bonds matching all given conditions, bonds with unknown value never match a condition on it"""
+        mask = np.ones(len(self), dtype=bool)
+        if mat_date_from is not None:
+            mask &= self.mat_date >= np.datetime64(mat_date_from, "D")
+        if mat_date_till is not None:
+            mask &= self.mat_date <= np.datetime64(mat_date_till, "D")
+        if min_coupon_percent is not None:
+            mask &= self.coupon_percent >= min_coupon_percent
+        if max_coupon_percent is not None:
+            mask &= self.coupon_percent <= max_coupon_percent
+        if min_yield is not None:
+            mask &= self.yield_percent >= min_yield
+        if max_yield is not None:
+            mask &= self.yield_percent <= max_yield
+        if offer_date_till is not None:
+            mask &= self.offer_date <= np.datetime64(offer_date_till, "D")
+        if without_offers:
+            mask &= np.isnat(self.offer_date)
+        if currency is not None:
+            mask &= self.currency == currency
+        if for_qualified_investors is not None:
+            mask &= self.is_qualified_investors == for_qualified_investors
+        if early_repayment is not None:
+            mask &= self.early_repayment == early_repayment
+        return self.filter(mask)
+
+    def sort(self, by: str, descending: bool = False) -> "BondUniverse":
+        """Sort by column name, unknown values (nan/NaT) go last"""
+        order = np.argsort(getattr(self, by), kind="stable")
+        if descending:
+            values = getattr(self, by)[order]
+            unknown = np.isnat(values) if values.dtype.kind == "M" else values != values
+            order = np.concatenate([order[~unknown][::-1], order[unknown]])
+        return self.filter(order)
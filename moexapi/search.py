@@ -0,0 +1,171 @@
+import typing as T
+
+import bisect
+import collections
+import heapq
+import re
+
+from . import markets
+from . import tickers
+
+
+# field weights: exact secid is the best match, words of full name are the weakest
+_FIELDS = ["secid", "isin", "shortname", "name"]
+_WEIGHTS = [4, 3, 2, 1]
+_EXACT = 100
+_PREFIX = 10
+_SUBSTRING = 1
+_MIN_SIMILARITY = 0.5
+_SPACES = re.compile(r"[\W_]+")
+
+
+def normalize(text: T.Optional[str]) -> str:
+    """Lowercase text without spaces and punctuation, ё is replaced by е"""
+    if not text:
+        return ""
+    return _SPACES.sub("", text.lower().replace("ё", "е"))
+
+
+def _trigrams(text: str) -> set[str]:
+    return {text[idx:idx + 3] for idx in range(len(text) - 2)}
+
+
+class SearchIndex:
+    """
+    Type-ahead search over secid, isin, shortname and name of listings
+
+    Queries of three and more characters are looked up in trigram postings, shorter ones
+    in sorted prefixes. Every field gets exact > prefix > substring score times field weight.
+    If nothing contains the query, listings sharing most trigrams with it are returned (typos).
+    """
+    def __init__(self, listings: T.Iterable[tickers.Listing] = ()):
+        self._listings: dict[int, tickers.Listing] = {}
+        self._fields: dict[int, list[str]] = {}
+        self._ids: dict[tuple[str, markets.Market], int] = {}
+        self._trigrams: dict[str, set[int]] = collections.defaultdict(set)
+        # (field value, doc, field weight) sorted for prefix lookups
+        self._prefixes: list[tuple[str, int, int]] = []
+        self._next_id = 0
+        # the last listing with the same secid and market wins, as with add()
+        unique = {(listing.secid, listing.market): listing for listing in listings}
+        for listing in unique.values():
+            self._index(listing, self._prefixes.append)
+        self._prefixes.sort()
+
+    def __len__(self) -> int:
+        return len(self._listings)
+
+    def add(self, listing: tickers.Listing) -> None:
+        """Add listing, a listing with the same secid and market is replaced"""
+        self.remove(listing.secid, listing.market)
+        self._index(listing, lambda item: bisect.insort(self._prefixes, item))
+
+    def _index(self, listing: tickers.Listing, add_prefix: T.Callable[[tuple[str, int, int]], None]) -> None:
+        doc = self._next_id
+        self._next_id += 1
+        fields = [normalize(getattr(listing, field)) for field in _FIELDS]
+        self._listings[doc] = listing
+        self._fields[doc] = fields
+        self._ids[(listing.secid, listing.market)] = doc
+        for field, weight in zip(fields, _WEIGHTS):
+            for trigram in _trigrams(field):
+                self._trigrams[trigram].add(doc)
+            if field:
+                add_prefix((field, doc, weight))
+
+    def remove(self, secid: str, market: markets.Market) -> bool:
+        """Remove listing, return False if it is not indexed"""
+        doc = self._ids.pop((secid, market), None)
+        if doc is None:
+            return False
+        del self._listings[doc]
+        for field, weight in zip(self._fields.pop(doc), _WEIGHTS):
+            for trigram in _trigrams(field):
+                postings = self._trigrams[trigram]
+                postings.discard(doc)
+                if not postings:
+                    del self._trigrams[trigram]
+            if field:
+                del self._prefixes[bisect.bisect_left(self._prefixes, (field, doc, weight))]
+        return True
+
+    def update(self, listings: T.Iterable[tickers.Listing]) -> None:
+        """Make index contain exactly listings, only changed listings are reindexed"""
+        actual = {(listing.secid, listing.market): listing for listing in listings}
+        for key in [key for key in self._ids if key not in actual]:
+            self.remove(*key)
+        for key, listing in actual.items():
+            doc = self._ids.get(key)
+            if doc is None or self._listings[doc] != listing:
+                self.add(listing)
+
+    def _score(self, doc: int, query: str) -> int:
+        score = 0
+        for field, weight in zip(self._fields[doc], _WEIGHTS):
+            if field == query:
+                score = max(score, _EXACT * weight)
+            elif field.startswith(query):
+                score = max(score, _PREFIX * weight)
+            elif query in field:
+                score = max(score, _SUBSTRING * weight)
+        return score
+
+    def _prefix_scores(self, query: str) -> dict[int, float]:
+        scores: dict[int, float] = {}
+        idx = bisect.bisect_left(self._prefixes, (query, -1, -1))
+        while idx < len(self._prefixes) and self._prefixes[idx][0].startswith(query):
+            field, doc, weight = self._prefixes[idx]
+            score = (_EXACT if field == query else _PREFIX) * weight
+            if score > scores.get(doc, 0):
+                scores[doc] = score
+            idx += 1
+        return scores
+
+    def _substring_scores(self, query: str) -> dict[int, float]:
+        postings = sorted((self._trigrams.get(trigram, set()) for trigram in _trigrams(query)), key=len)
+        scores: dict[int, float] = {}
+        for doc in set.intersection(*postings) if postings[0] else set():
+            score = self._score(doc, query)
+            if score > 0:
+                scores[doc] = score
+        return scores
+
+    def _similar(self, query: str) -> dict[int, float]:
+        trigrams = _trigrams(query)
+        counts: collections.Counter = collections.Counter()
+        for trigram in trigrams:
+            counts.update(self._trigrams.get(trigram, ()))
+        return {doc: count / len(trigrams) for doc, count in counts.items() if count / len(trigrams) >= _MIN_SIMILARITY}
+
+    def search(
+        self,
+        query: str,
+        limit: T.Optional[int] = 10,
+        market: markets.Market = markets.Markets.ALL,
+    ) -> list[tickers.Listing]:
+        """Best listings of market for query, traded listings go first among equal scores"""
+        query = normalize(query)
+        if not query:
+            return []
+        if len(query) < 3:
+            scores = self._prefix_scores(query)
+        else:
+            scores = self._substring_scores(query) or self._similar(query)
+        docs = list(scores)
+        if market != markets.Markets.ALL:
+            docs = [doc for doc in docs if market.has(self._listings[doc].market)]
+
+        def rank(doc: int) -> tuple:
+            listing = self._listings[doc]
+            return -scores[doc], not listing.is_traded, len(self._fields[doc][2]), listing.secid
+
+        if limit is None:
+            docs.sort(key=rank)
+        else:
+            docs = heapq.nsmallest(limit, docs, key=rank)
+        return [self._listings[doc] for doc in docs]
+
+
+def build_index(market: markets.Market = markets.Markets.ALL) -> SearchIndex:
+    """Index all listings of market"""
+    return SearchIndex(tickers._parse_tickers(market=market))
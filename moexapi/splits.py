@@ -1,3 +1,5 @@
+import typing as T
+
 import dataclasses
 import datetime
 
@@ -6,6 +8,10 @@ from . import tickers
 from . import utils
 
 
+# filled by universe.install_universe
+_PRELOADED_SPLITS: T.Optional[list["Split"]] = None
+
+
 @dataclasses.dataclass
 class Split:
     date: datetime.date
@@ -15,7 +21,12 @@ class Split:
 
 def get_splits() -> list[Split]:
     """Return all splits on moex"""
-    response = utils.json_api_call("https://iss.moex.com/iss/statistics/engines/stock/splits.json")
+    if _PRELOADED_SPLITS is not None:
+        return list(_PRELOADED_SPLITS)
+    response = utils.json_api_call(
+        "https://iss.moex.com/iss/statistics/engines/stock/splits.json?"
+        + utils.iss_params({"splits": ["tradedate", "secid", "before", "after"]})
+    )
     splits = utils.prepare_dict(response, "splits")
     result = [Split(date=datetime.date(2014, 12, 30), secid="IRAO", mult=0.01)]
     for line in splits:
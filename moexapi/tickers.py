@@ -1,8 +1,10 @@
 import typing as T
 
 import collections
+import concurrent.futures
 import dataclasses
 import datetime
+import threading
 
 from . import exchange
 from . import markets
@@ -11,6 +13,13 @@ from . import utils
 
 logger = utils.initialize_logging(__file__)
 
+_LISTING_PREFETCH = 4
+
+# filled by universe.install_universe, listings of markets out of _PRELOADED_MARKET are requested
+_PRELOADED_MARKET: markets.Market = markets.Markets.ALL
+_PRELOADED_LISTINGS: T.Optional[list["Listing"]] = None
+_PRELOADED_TICKERS: dict[tuple[str, markets.Market], "Ticker"] = {}
+
 
 SECID = "SECID"
 ISIN = "ISIN"
@@ -19,6 +28,7 @@ BOARDID = "BOARDID"
 LAST = "LAST"
 PREVPRICE = "PREVPRICE"
 SECSUBTYPE = "SECSUBTYPE"
+SECTYPE = "SECTYPE"
 LISTLEVEL = "LISTLEVEL"
 LOTVALUE = "LOTVALUE"
 CURRENTVALUE = "CURRENTVALUE"
@@ -30,6 +40,25 @@ CURRENCY = "CURRENCYID"
 IS_TRADED = "is_traded"
 LISTED_TILL = "listed_till"
 
+_LISTING_PARAMS = utils.iss_params({
+    "securities": ["secid", "shortname", "name", "isin", "type", "primary_boardid", "is_traded"],
+})
+_MARKET_PARAMS = utils.iss_params({
+    "securities": [
+        SECID, BOARDID, SHORTNAME, PREVPRICE, ACCRUEDINT, FACEVALUEONSETTLEDATE, LOTVALUE, FACEUNIT, CURRENCY, LISTLEVEL,
+        SECTYPE,
+    ],
+    "marketdata": [LAST, CURRENTVALUE, VALTODAY],
+})
+# description and boards of /securities/{secid}.json are requested together to share one cached response
+_SECURITY_TYPES_PARAMS = utils.iss_params({
+    "securitytypes": ["trade_engine_name", "security_type_name", "stock_type"],
+})
+_SECURITY_PARAMS = utils.iss_params({
+    "description": ["name", "value"],
+    "boards": [BOARDID.lower(), "engine", "market", CURRENCY.lower(), IS_TRADED, LISTED_TILL],
+})
+
 
 def _sur_to_rub(currency: T.Optional[str]) -> T.Optional[str]:
     if currency == "SUR":
@@ -60,11 +89,69 @@ class Listing:
     isin: T.Optional[str]
     board: T.Optional[str]
     is_traded: bool
+    name: T.Optional[str] = None
 
     def __hash__(self):
         return hash(self.secid) + hash(self.market)
 
 
+@dataclasses.dataclass
+class _Price:
+    currency: str
+    raw_price: T.Optional[float]
+    price: T.Optional[float]
+    price_in_rub: T.Optional[float]
+    accumulated_coupon: float
+
+
+def _get_price(
+    sec_line: dict[str, T.Any],
+    market_line: dict[str, T.Any],
+    market: markets.Market,
+    rates: T.Optional[dict[str, float]] = None,
+) -> _Price:
+    """Price of one board line of securities+marketdata response, rates is optional cache of exchange rates"""
+    if market == markets.Markets.INDEX:
+        raw_price = market_line[CURRENTVALUE]
+    else:
+        raw_price = market_line[LAST]
+        if raw_price is None:
+            raw_price = sec_line[PREVPRICE]
+    accumulated_coupon = 0
+    if ACCRUEDINT in sec_line:
+        accumulated_coupon = sec_line[ACCRUEDINT]
+    lotvalue = sec_line.get(FACEVALUEONSETTLEDATE)
+    if lotvalue is None:
+        lotvalue = sec_line.get(LOTVALUE)
+    currency = _get_security_currency(sec_line)
+    rate = 1
+    price = raw_price
+    if currency is not None and currency != "RUB" and market != markets.Markets.CURRENCY and price is not None:
+        if rates is None:
+            rate = exchange.get_rate(currency)
+        else:
+            if currency not in rates:
+                rates[currency] = exchange.get_rate(currency)
+            rate = rates[currency]
+    if price is not None:
+        if lotvalue is not None:
+            price *= lotvalue / 100
+        if accumulated_coupon:
+            coupon_currency = _sur_to_rub(sec_line[CURRENCY])
+            if coupon_currency is not None and coupon_currency != currency:
+                assert coupon_currency == "RUB"
+                accumulated_coupon /= rate
+            price += accumulated_coupon
+    price_in_rub = price * rate if price is not None else None
+    return _Price(
+        currency=currency,
+        raw_price=raw_price,
+        price=price,
+        price_in_rub=price_in_rub,
+        accumulated_coupon=accumulated_coupon,
+    )
+
+
 @dataclasses.dataclass
 class TickerBoardInfo:
     boards: list[str]
@@ -78,7 +165,7 @@ class TickerBoardInfo:
 
     @classmethod
     def from_secid(cls, secid: str, market: markets.Market, primary_board: str) -> T.Optional["TickerBoardInfo"]:
-        response = utils.json_api_call(f"https://iss.moex.com/iss{market.path}/securities/{secid}.json")
+        response = utils.json_api_call(f"https://iss.moex.com/iss{market.path}/securities/{secid}.json?{_MARKET_PARAMS}")
         securities = utils.prepare_dict(response, "securities")
         marketdata = utils.prepare_dict(response, "marketdata")
         assert len(securities) == len(marketdata)
@@ -91,46 +178,20 @@ class TickerBoardInfo:
                 continue
             else:
                 assert result is None, f"Second accurance of ticker {secid}: {result.boards[0]} vs {board}"
-            if market == markets.Markets.INDEX:
-                raw_price = market_line[CURRENTVALUE]
-            else:
-                raw_price = market_line[LAST]
-                if raw_price is None:
-                    raw_price = sec_line[PREVPRICE]
-            accumulated_coupon = 0
-            if ACCRUEDINT in sec_line:
-                accumulated_coupon = sec_line[ACCRUEDINT]
-            lotvalue = sec_line.get(FACEVALUEONSETTLEDATE)
-            if lotvalue is None:
-                lotvalue = sec_line.get(LOTVALUE)
-            currency = _get_security_currency(sec_line)
-            rate = 1
-            price = raw_price
-            if currency is not None and currency != "RUB" and market != markets.Markets.CURRENCY and price is not None:
-                rate = exchange.get_rate(currency)
-            if price is not None:
-                if lotvalue is not None:
-                    price *= lotvalue / 100
-                if accumulated_coupon:
-                    coupon_currency = _sur_to_rub(sec_line[CURRENCY])
-                    if coupon_currency is not None and coupon_currency != currency:
-                        assert coupon_currency == "RUB"
-                        accumulated_coupon /= rate
-                    price += accumulated_coupon
-            price_in_rub = price * rate if price is not None else None
+            price = _get_price(sec_line, market_line, market)
             result = cls(
                 boards=[board],
-                currency=currency,
-                raw_price=raw_price,
-                price=price,
-                price_in_rub=price_in_rub,
-                accumulated_coupon=accumulated_coupon,
+                currency=price.currency,
+                raw_price=price.raw_price,
+                price=price.price,
+                price_in_rub=price.price_in_rub,
+                accumulated_coupon=price.accumulated_coupon,
                 listlevel=sec_line.get(LISTLEVEL),
                 value=market_line[VALTODAY],
             )
         if result:
             result.boards.extend(board for board, currency in boards if currency == result.currency)
-            response = utils.json_api_call(f"https://iss.moex.com/iss/securities/{secid}.json")
+            response = utils.json_api_call(f"https://iss.moex.com/iss/securities/{secid}.json?{_SECURITY_PARAMS}")
             for line in utils.prepare_dict(response, "boards"):
                 board = line[BOARDID.lower()]
                 if (
@@ -144,7 +205,7 @@ class TickerBoardInfo:
 
 
 def get_ticker_info_dict(secid: str) -> dict[str, str]:
-    response = utils.json_api_call(f"https://iss.moex.com/iss/securities/{secid}.json")
+    response = utils.json_api_call(f"https://iss.moex.com/iss/securities/{secid}.json?{_SECURITY_PARAMS}")
     description_columns, description_data = response["description"]["columns"], response["description"]["data"]
     return {
         line[description_columns.index("name")]: line[description_columns.index("value")]
@@ -163,7 +224,7 @@ class TickerInfo:
 
     @classmethod
     def from_secid(cls, secid: str, market: markets.Market) -> "TickerInfo":
-        response = utils.json_api_call(f"https://iss.moex.com/iss/securities/{secid}.json")
+        response = utils.json_api_call(f"https://iss.moex.com/iss/securities/{secid}.json?{_SECURITY_PARAMS}")
         boards = utils.prepare_dict(response, "boards")
         is_traded = False
         listed_till = datetime.date.min
@@ -205,6 +266,9 @@ class Ticker:
     listed_till: T.Optional[datetime.date] = None
     @classmethod
     def from_listing(cls, listing: Listing) -> "Ticker":
+        preloaded = _PRELOADED_TICKERS.get((listing.secid, listing.market))
+        if preloaded is not None:
+            return _copy_ticker(preloaded)
         info = TickerInfo.from_secid(listing.secid, listing.market)
         assert info.shortname is None or listing.shortname == info.shortname
         result = cls(
@@ -228,15 +292,22 @@ class Ticker:
         return result
 
     @classmethod
-    def from_secid(cls, secid: str, market: markets.Market = markets.Markets.ALL, allow_delisted: bool = False) -> "Ticker":
+    def from_secid(
+        cls,
+        secid: str,
+        market: markets.Market = markets.Markets.ALL,
+        allow_delisted: bool = False,
+        lazy: bool = False,
+    ) -> "Ticker":
         parsed_tickers = _parse_tickers(market=market)
-        tickers = [cls.from_listing(ticker) for ticker in parsed_tickers if ticker.secid == secid]
+        load = LazyTicker if lazy else cls.from_listing
+        tickers = [load(ticker) for ticker in parsed_tickers if ticker.secid == secid]
         if len([ticker for ticker in tickers if ticker.is_traded]) == 0:
             tickers.extend([
-                cls.from_listing(ticker) for ticker in parsed_tickers if ticker.shortname.replace(' ', '') == secid
+                load(ticker) for ticker in parsed_tickers if ticker.shortname.replace(' ', '') == secid
             ])
         if len([ticker for ticker in tickers if ticker.is_traded]) == 0:
-            tickers.extend([cls.from_listing(ticker) for ticker in parsed_tickers if ticker.isin == secid])
+            tickers.extend([load(ticker) for ticker in parsed_tickers if ticker.isin == secid])
         if (
             len([ticker for ticker in tickers if ticker.is_traded]) == 0 and
             len(secid) == 3 and
@@ -244,12 +315,12 @@ class Ticker:
         ):
             cur_secid = f"{secid}RUB_TOM"
             tickers.extend([
-                cls.from_listing(ticker)
+                load(ticker)
                 for ticker in parsed_tickers if ticker.secid == cur_secid and market.has(markets.Markets.CURRENCY)
             ])
             if len([ticker for ticker in tickers if ticker.is_traded]) == 0:
                 tickers.extend([
-                    cls.from_listing(ticker) for ticker in parsed_tickers
+                    load(ticker) for ticker in parsed_tickers
                     if ticker.shortname == cur_secid and market.has(markets.Markets.CURRENCY)
                 ])
         if len(tickers) > 1 and len([ticker for ticker in tickers if ticker.is_traded]) != 0:
@@ -270,7 +341,7 @@ class Ticker:
                 logger.error(f'Find too many tickers for {secid}: {tickers}')
             if allow_delisted and len(tickers) == 0:
                 info = TickerInfo.from_secid(secid, market)
-                response = utils.json_api_call(f"https://iss.moex.com/iss/securities/{secid}.json")
+                response = utils.json_api_call(f"https://iss.moex.com/iss/securities/{secid}.json?{_SECURITY_PARAMS}")
                 boards = [line["boardid"] for line in utils.prepare_dict(response, "boards")]
                 if boards:
                     return cls(secid=secid, alias=secid, is_traded=False, market=market, shortname=info.shortname, isin=info.isin, subtype=info.subtype, listlevel=info.listlevel, boards=boards, listed_till=info.listed_till)
@@ -279,18 +350,122 @@ class Ticker:
         return tickers[0]
 
 
+def _copy_ticker(ticker: Ticker) -> Ticker:
+    """Plain Ticker with fields of ticker (LazyTicker is loaded), boards list is copied"""
+    result = Ticker(**{field.name: getattr(ticker, field.name) for field in dataclasses.fields(Ticker)})
+    result.boards = list(result.boards)
+    return result
+
+
+_LAZY_FIELDS = frozenset([
+    "isin",
+    "subtype",
+    "listlevel",
+    "boards",
+    "currency",
+    "raw_price",
+    "price",
+    "price_in_rub",
+    "accumulated_coupon",
+    "value",
+    "listed_till",
+])
+
+
+class LazyTicker(Ticker):
+    """
+    Ticker created from listing without requests
+
+    secid, alias, is_traded, market and shortname are available at once,
+    other fields are loaded by Ticker.from_listing on first access.
+    repr shows only available fields, but == compares all fields and so loads both tickers,
+    as does de-duplication by Ticker.from_secid.
+    """
+    def __init__(self, listing: Listing):
+        self.secid = listing.secid
+        self.alias = listing.secid
+        self.is_traded = listing.is_traded
+        self.market = listing.market
+        self.shortname = listing.shortname
+        self._listing = listing
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def __getattribute__(self, name: str) -> T.Any:
+        if name in _LAZY_FIELDS and not object.__getattribute__(self, "_loaded"):
+            object.__getattribute__(self, "materialize")()
+        return object.__getattribute__(self, name)
+
+    def __repr__(self) -> str:
+        values = object.__getattribute__(self, "__dict__")
+        fields = ", ".join(
+            f"{field.name}={values[field.name]!r}" for field in dataclasses.fields(Ticker) if field.name in values
+        )
+        return f"{type(self).__name__}({fields})"
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded
+
+    def materialize(self) -> "LazyTicker":
+        """Load fields once, concurrent first accesses wait for one load"""
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    ticker = Ticker.from_listing(self._listing)
+                    for key in _LAZY_FIELDS:
+                        setattr(self, key, getattr(ticker, key))
+                    self._loaded = True
+        return self
+
+
+def materialize_tickers(ticker_list: list[Ticker], max_workers: T.Optional[int] = None) -> list[Ticker]:
+    """Load fields of lazy tickers concurrently"""
+    lazy_tickers = [ticker for ticker in ticker_list if isinstance(ticker, LazyTicker) and not ticker.is_loaded]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(LazyTicker.materialize, lazy_tickers))
+    return ticker_list
+
+
+def _fetch_listing_page(market: markets.Market, idx: int) -> list[dict[str, T.Any]]:
+    response = utils.json_api_call(
+        f"https://iss.moex.com/iss/securities.json?{market.query}&{_LISTING_PARAMS}&start={idx}"
+    )
+    return utils.prepare_dict(response, "securities")
+
+
+def _fetch_listing_pages(market: markets.Market) -> list[list[dict[str, T.Any]]]:
+    """First page gives page size, then next _LISTING_PREFETCH pages are requested at once till a short page"""
+    pages = [_fetch_listing_page(market, 0)]
+    page_size = len(pages[0])
+    if page_size == 0:
+        return pages
+    with concurrent.futures.ThreadPoolExecutor(max_workers=_LISTING_PREFETCH) as executor:
+        idx = page_size
+        while len(pages[-1]) == page_size:
+            starts = range(idx, idx + page_size * _LISTING_PREFETCH, page_size)
+            for page in executor.map(lambda start: _fetch_listing_page(market, start), starts):
+                pages.append(page)
+                if len(page) < page_size:
+                    break
+            idx += page_size * _LISTING_PREFETCH
+    return pages
+
+
 def _parse_tickers(market: markets.Market = markets.Markets.ALL) -> list[Listing]:
     tickers: dict[str, Listing] = {}
-    for child_market in market.childs():
-        idx = 0
-        while True:
-            start = f"&start={idx}"
-            response = utils.json_api_call(
-                f"https://iss.moex.com/iss/securities.json?{child_market.query}{start}"
-            )
-            securities = utils.prepare_dict(response, "securities")
-            if len(securities) == 0:
-                break
+    child_markets = market.childs()
+    if _PRELOADED_LISTINGS is not None:
+        for listing in _PRELOADED_LISTINGS:
+            if market.has(listing.market):
+                tickers[listing.secid] = listing
+        child_markets = [child_market for child_market in child_markets if not _PRELOADED_MARKET.has(child_market)]
+        if not child_markets:
+            return list(tickers.values())
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(child_markets)) as executor:
+        market_pages = list(executor.map(_fetch_listing_pages, child_markets))
+    for child_market, pages in zip(child_markets, market_pages):
+        for securities in pages:
             for line in securities:
                 if child_market.security_types and line.get("type") not in child_market.security_types:
                     continue
@@ -308,20 +483,110 @@ def _parse_tickers(market: markets.Market = markets.Markets.ALL) -> list[Listing
                         isin=isin,
                         board=board,
                         is_traded=line["is_traded"],
+                        name=line.get("name"),
                     )
-            idx += len(securities)
     return list(tickers.values())
 
 
-def get_ticker(secid: str, market: markets.Market = markets.Markets.ALL, allow_delisted: bool = False) -> Ticker:
-    return Ticker.from_secid(secid, market=market, allow_delisted=allow_delisted)
+@dataclasses.dataclass
+class Snapshot:
+    """
+    Current price of security on one board
+
+    raw_price -- last price (current value for indices), previous price if there were no trades today
+    price -- price of one security in its currency with accumulated coupon
+    value -- sum of all today transactions in RUB
+    """
+    secid: str
+    board: str
+    shortname: T.Optional[str]
+    currency: str
+    raw_price: T.Optional[float]
+    prev_price: T.Optional[float]
+    price: T.Optional[float]
+    price_in_rub: T.Optional[float]
+    accumulated_coupon: float
+    value: T.Optional[float]
+
+
+def _security_type_codes(market: markets.Market) -> set[str]:
+    """SECTYPE codes of engine/market securities, which correspond to security types of market"""
+    response = utils.json_api_call(f"https://iss.moex.com/iss/securitytypes.json?{_SECURITY_TYPES_PARAMS}")
+    return {
+        line["stock_type"]
+        for line in utils.prepare_dict(response, "securitytypes")
+        if line["trade_engine_name"] in market.engines and line["security_type_name"] in market.security_types
+    }
+
+
+def get_snapshot(market: markets.Market, boards: T.Optional[list[str]] = None) -> list[Snapshot]:
+    """
+    Return current prices of all securities of market with one request per market (or per board)
+
+    boards -- limit every market to these boards, markets defined by other boards are skipped
+    """
+    result = []
+    rates: dict[str, float] = {}
+    for child_market in market.childs():
+        child_boards = sorted(child_market.boards)
+        if boards is not None:
+            child_boards = sorted(set(boards) & child_market.boards) if child_market.boards else list(boards)
+            if not child_boards:
+                continue
+        sectypes = None
+        if child_market.security_types:
+            sectypes = _security_type_codes(child_market)
+        urls = [f"https://iss.moex.com/iss{child_market.path}/boards/{board}/securities.json?{_MARKET_PARAMS}"
+            for board in child_boards]
+        if not urls:
+            urls = [f"https://iss.moex.com/iss{child_market.path}/securities.json?{_MARKET_PARAMS}"]
+        for url in urls:
+            response = utils.json_api_call(url)
+            securities = utils.prepare_dict(response, "securities")
+            marketdata = utils.prepare_dict(response, "marketdata")
+            assert len(securities) == len(marketdata)
+            for sec_line, market_line in zip(securities, marketdata):
+                if sectypes is not None and sec_line.get(SECTYPE) not in sectypes:
+                    continue
+                price = _get_price(sec_line, market_line, child_market, rates=rates)
+                result.append(
+                    Snapshot(
+                        secid=sec_line[SECID],
+                        board=sec_line[BOARDID],
+                        shortname=sec_line.get(SHORTNAME),
+                        currency=price.currency,
+                        raw_price=price.raw_price,
+                        prev_price=sec_line.get(PREVPRICE),
+                        price=price.price,
+                        price_in_rub=price.price_in_rub,
+                        accumulated_coupon=price.accumulated_coupon,
+                        value=market_line.get(VALTODAY),
+                    )
+                )
+    return result
+
+
+def get_ticker(
+    secid: str,
+    market: markets.Market = markets.Markets.ALL,
+    allow_delisted: bool = False,
+    lazy: bool = False,
+) -> Ticker:
+    """With lazy=True return LazyTicker, which loads board and price fields on first access"""
+    return Ticker.from_secid(secid, market=market, allow_delisted=allow_delisted, lazy=lazy)
 
 
 def get_tickers(
     market: markets.Market = markets.Markets.ALL,
     is_traded: T.Optional[bool] = None,
-    limit: T.Optional[int] = None
+    limit: T.Optional[int] = None,
+    lazy: bool = False,
 ) -> list[Ticker]:
+    """
+    Ticker of every listing of market, loaded by Ticker.from_listing
+
+    With lazy=True return LazyTicker for every listing without requests, see materialize_tickers.
+    """
     tickers = _parse_tickers(market=market)
     result = []
     for ticker in tickers:
@@ -329,5 +594,8 @@ def get_tickers(
             break
         if is_traded is not None and ticker.is_traded != is_traded:
             continue
-        result.append(Ticker.from_secid(secid=ticker.secid, market=ticker.market))
+        if lazy:
+            result.append(LazyTicker(ticker))
+        else:
+            result.append(Ticker.from_listing(ticker))
     return result
@@ -0,0 +1,237 @@
+import typing as T
+
+import dataclasses
+import datetime
+
+import numpy as np
+
+from . import changeover
+from . import markets
+from . import splits
+from . import tickers
+
+
+_UNIVERSE_VERSION = 2
+
+
+@dataclasses.dataclass
+class Universe:
+    """
+    Resolved listings, tickers, changeovers and splits
+
+    Prices of tickers are actual for the export time. Listings and tickers cover only market,
+    installed universe requests listings of other markets.
+    """
+    listings: list[tickers.Listing]
+    tickers: list[tickers.Ticker]
+    changeovers: list[changeover.Changeover]
+    splits: list[splits.Split]
+    market: markets.Market = markets.Markets.ALL
+
+
+def _to_str(values: list[T.Optional[str]]) -> np.ndarray:
+    return np.array(["" if value is None else value for value in values], dtype=str)
+
+
+def _from_str(values: np.ndarray) -> list[T.Optional[str]]:
+    return [value if value else None for value in values.tolist()]
+
+
+def _to_float(values: list[T.Optional[float]]) -> np.ndarray:
+    return np.array(values, dtype=float)
+
+
+def _from_float(values: np.ndarray) -> list[T.Optional[float]]:
+    return [None if value != value else value for value in values.tolist()]
+
+
+def _to_int(values: list[T.Optional[int]]) -> np.ndarray:
+    return np.array([-1 if value is None else value for value in values], dtype=np.int64)
+
+
+def _from_int(values: np.ndarray) -> list[T.Optional[int]]:
+    return [None if value < 0 else value for value in values.tolist()]
+
+
+def _to_date(values: list[T.Optional[datetime.date]]) -> np.ndarray:
+    return np.array(["NaT" if value is None else value for value in values], dtype="datetime64[D]")
+
+
+def _from_date(values: np.ndarray) -> list[T.Optional[datetime.date]]:
+    return values.astype(object).tolist()
+
+
+def save_universe(universe: Universe, path: str) -> None:
+    """Save universe to compressed .npz file with one array per column"""
+    np.savez_compressed(
+        path,
+        version=np.array(_UNIVERSE_VERSION),
+        market=np.array(str(universe.market)),
+        listing_secid=_to_str([item.secid for item in universe.listings]),
+        listing_market=_to_str([str(item.market) for item in universe.listings]),
+        listing_shortname=_to_str([item.shortname for item in universe.listings]),
+        listing_isin=_to_str([item.isin for item in universe.listings]),
+        listing_board=_to_str([item.board for item in universe.listings]),
+        listing_is_traded=np.array([bool(item.is_traded) for item in universe.listings], dtype=bool),
+        listing_name=_to_str([item.name for item in universe.listings]),
+        ticker_secid=_to_str([item.secid for item in universe.tickers]),
+        ticker_alias=_to_str([item.alias for item in universe.tickers]),
+        ticker_is_traded=np.array([bool(item.is_traded) for item in universe.tickers], dtype=bool),
+        ticker_market=_to_str([str(item.market) for item in universe.tickers]),
+        ticker_shortname=_to_str([item.shortname for item in universe.tickers]),
+        ticker_isin=_to_str([item.isin for item in universe.tickers]),
+        ticker_subtype=_to_str([item.subtype for item in universe.tickers]),
+        ticker_listlevel=_to_int([item.listlevel for item in universe.tickers]),
+        ticker_boards=_to_str([",".join(item.boards) for item in universe.tickers]),
+        ticker_currency=_to_str([item.currency for item in universe.tickers]),
+        ticker_raw_price=_to_float([item.raw_price for item in universe.tickers]),
+        ticker_price=_to_float([item.price for item in universe.tickers]),
+        ticker_price_in_rub=_to_float([item.price_in_rub for item in universe.tickers]),
+        ticker_accumulated_coupon=_to_float([item.accumulated_coupon for item in universe.tickers]),
+        ticker_value=_to_float([item.value for item in universe.tickers]),
+        ticker_listed_till=_to_date([item.listed_till for item in universe.tickers]),
+        changeover_date=_to_date([item.date for item in universe.changeovers]),
+        changeover_old_secid=_to_str([item.old_secid for item in universe.changeovers]),
+        changeover_new_secid=_to_str([item.new_secid for item in universe.changeovers]),
+        split_date=_to_date([item.date for item in universe.splits]),
+        split_secid=_to_str([item.secid for item in universe.splits]),
+        split_mult=_to_float([item.mult for item in universe.splits]),
+    )
+
+
+def export_universe(
+    path: str,
+    market: markets.Market = markets.Markets.ALL,
+    with_tickers: bool = True,
+    max_workers: T.Optional[int] = None,
+) -> Universe:
+    """Resolve all listings of market (and tickers if with_tickers) and save them to path"""
+    listings = tickers._parse_tickers(market=market)
+    ticker_list = []
+    if with_tickers:
+        lazy_tickers = tickers.materialize_tickers(
+            [tickers.LazyTicker(listing) for listing in listings],
+            max_workers=max_workers,
+        )
+        ticker_list = [tickers._copy_ticker(ticker) for ticker in lazy_tickers]
+    universe = Universe(
+        listings=listings,
+        tickers=ticker_list,
+        changeovers=changeover.get_changeovers(),
+        splits=splits.get_splits(),
+        market=market,
+    )
+    save_universe(universe, path)
+    return universe
+
+
+def load_universe(path: str, install: bool = True) -> Universe:
+    """Load universe saved by export_universe, with install=True use it instead of requests"""
+    with np.load(path) as data:
+        version = int(data["version"])
+        if version != _UNIVERSE_VERSION:
+            raise RuntimeError(f"Unsupported universe version {version}, expected {_UNIVERSE_VERSION}")
+        universe_market = markets.get_market(str(data["market"]))
+        listings = [
+            tickers.Listing(
+                secid=secid,
+                market=markets.get_market(market),
+                shortname=shortname,
+                isin=isin,
+                board=board,
+                is_traded=is_traded,
+                name=name,
+            )
+            for secid, market, shortname, isin, board, is_traded, name in zip(
+                _from_str(data["listing_secid"]),
+                _from_str(data["listing_market"]),
+                _from_str(data["listing_shortname"]),
+                _from_str(data["listing_isin"]),
+                _from_str(data["listing_board"]),
+                data["listing_is_traded"].tolist(),
+                _from_str(data["listing_name"]),
+            )
+        ]
+        ticker_list = [
+            tickers.Ticker(
+                secid=secid,
+                alias=alias,
+                is_traded=is_traded,
+                market=markets.get_market(market),
+                shortname=shortname,
+                isin=isin,
+                subtype=subtype,
+                listlevel=listlevel,
+                boards=boards.split(",") if boards else [],
+                currency=currency,
+                raw_price=raw_price,
+                price=price,
+                price_in_rub=price_in_rub,
+                accumulated_coupon=accumulated_coupon,
+                value=value,
+                listed_till=listed_till,
+            )
+            for (
+                secid, alias, is_traded, market, shortname, isin, subtype, listlevel, boards,
+                currency, raw_price, price, price_in_rub, accumulated_coupon, value, listed_till,
+            ) in zip(
+                _from_str(data["ticker_secid"]),
+                _from_str(data["ticker_alias"]),
+                data["ticker_is_traded"].tolist(),
+                _from_str(data["ticker_market"]),
+                _from_str(data["ticker_shortname"]),
+                _from_str(data["ticker_isin"]),
+                _from_str(data["ticker_subtype"]),
+                _from_int(data["ticker_listlevel"]),
+                data["ticker_boards"].tolist(),
+                _from_str(data["ticker_currency"]),
+                _from_float(data["ticker_raw_price"]),
+                _from_float(data["ticker_price"]),
+                _from_float(data["ticker_price_in_rub"]),
+                _from_float(data["ticker_accumulated_coupon"]),
+                _from_float(data["ticker_value"]),
+                _from_date(data["ticker_listed_till"]),
+            )
+        ]
+        changeovers = [
+            changeover.Changeover(date=date, old_secid=old_secid, new_secid=new_secid)
+            for date, old_secid, new_secid in zip(
+                _from_date(data["changeover_date"]),
+                _from_str(data["changeover_old_secid"]),
+                _from_str(data["changeover_new_secid"]),
+            )
+        ]
+        split_list = [
+            splits.Split(date=date, secid=secid, mult=mult)
+            for date, secid, mult in zip(
+                _from_date(data["split_date"]),
+                _from_str(data["split_secid"]),
+                _from_float(data["split_mult"]),
+            )
+        ]
+    universe = Universe(
+        listings=listings,
+        tickers=ticker_list,
+        changeovers=changeovers,
+        splits=split_list,
+        market=universe_market,
+    )
+    if install:
+        install_universe(universe)
+    return universe
+
+
+def install_universe(universe: T.Optional[Universe]) -> None:
+    """Serve listings, tickers, changeovers and splits from universe, None returns to requests"""
+    if universe is None:
+        tickers._PRELOADED_MARKET = markets.Markets.ALL
+        tickers._PRELOADED_LISTINGS = None
+        tickers._PRELOADED_TICKERS = {}
+        changeover._PRELOADED_CHANGEOVERS = None
+        splits._PRELOADED_SPLITS = None
+        return
+    tickers._PRELOADED_MARKET = universe.market
+    tickers._PRELOADED_LISTINGS = list(universe.listings)
+    tickers._PRELOADED_TICKERS = {(ticker.secid, ticker.market): ticker for ticker in universe.tickers}
+    changeover._PRELOADED_CHANGEOVERS = list(universe.changeovers)
+    splits._PRELOADED_SPLITS = list(universe.splits)
@@ -1,20 +1,29 @@
 import typing as T
 
+import atexit
 import collections
+import contextlib
+import dataclasses
+import gzip
 import json
 import logging
+import os
+import threading
 import time
 
-import requests
-
 
 _CACHE_SIZE = 1000
 _CACHED_TABLE = collections.OrderedDict()
+# responses with ETag/Last-Modified outlive _CACHED_TABLE eviction, so they can be revalidated
+_VALIDATED_SIZE = 100
+_VALIDATED_TABLE: "collections.OrderedDict[str, _Validated]" = collections.OrderedDict()
 
 
 def initialize_logging(name: str) -> logging.Logger:
     log = logging.getLogger(name)
     log.setLevel(logging.INFO)
+    if log.handlers:
+        return log
     _stream_handler = logging.StreamHandler()
     _stream_handler.setLevel(logging.DEBUG)
     _stream_handler.setFormatter(logging.Formatter(
@@ -28,25 +37,225 @@ def initialize_logging(name: str) -> logging.Logger:
 logger = initialize_logging(__file__)
 
 
-def _cached_request(url: str, timeout: int = 10) -> T.Any:
-    if url in _CACHED_TABLE:
-        _CACHED_TABLE.move_to_end(url)
-        return _CACHED_TABLE[url]
+_RECORD = "record"
+_REPLAY = "replay"
+
+
+class ReplayMiss(KeyError):
+    """Replayed archive has no response for url"""
+
+
+class _Archive:
+    """url -> response text pairs stored in gzip compressed json"""
+    def __init__(self, path: str, mode: str):
+        self.path = path
+        self.mode = mode
+        self.responses: dict[str, str] = {}
+        self._lock = threading.Lock()
+        if mode == _REPLAY or os.path.exists(path):
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                self.responses = json.load(f)
+
+    def get(self, url: str) -> str:
+        if url not in self.responses:
+            raise ReplayMiss(url)
+        return self.responses[url]
+
+    def add(self, url: str, text: str) -> None:
+        with self._lock:
+            self.responses[url] = text
+
+    def save(self) -> None:
+        with self._lock:
+            with gzip.open(f"{self.path}.tmp", "wt", encoding="utf-8") as f:
+                json.dump(self.responses, f, ensure_ascii=False)
+            os.replace(f"{self.path}.tmp", self.path)
+
+
+_ARCHIVE: T.Optional[_Archive] = None
+
+
+@contextlib.contextmanager
+def _use_archive(archive: _Archive) -> T.Iterator[_Archive]:
+    global _ARCHIVE
+    prev_archive = _ARCHIVE
+    _ARCHIVE = archive
+    _CACHED_TABLE.clear()
+    _VALIDATED_TABLE.clear()
+    try:
+        yield archive
+    finally:
+        _ARCHIVE = prev_archive
+        _CACHED_TABLE.clear()
+        _VALIDATED_TABLE.clear()
+        if archive.mode == _RECORD:
+            archive.save()
+
+
+def recording(path: str) -> T.ContextManager[_Archive]:
+    """Save every response received inside the block to archive at path (existing archive is extended)"""
+    return _use_archive(_Archive(path, _RECORD))
+
+
+def replaying(path: str) -> T.ContextManager[_Archive]:
+    """Serve all requests inside the block from archive at path, raise ReplayMiss for unknown urls"""
+    return _use_archive(_Archive(path, _REPLAY))
+
+
+def _archive_from_env() -> T.Optional[_Archive]:
+    if os.environ.get("MOEXAPI_REPLAY"):
+        return _Archive(os.environ["MOEXAPI_REPLAY"], _REPLAY)
+    if os.environ.get("MOEXAPI_RECORD"):
+        archive = _Archive(os.environ["MOEXAPI_RECORD"], _RECORD)
+        atexit.register(archive.save)
+        return archive
+    return None
+
+
+_ARCHIVE = _archive_from_env()
+
+
+_NOT_MODIFIED = 304
+
+
+@dataclasses.dataclass
+class Response:
+    status: int
+    text: str
+    etag: T.Optional[str] = None
+    last_modified: T.Optional[str] = None
+
+
+@dataclasses.dataclass
+class _Validated:
+    etag: T.Optional[str]
+    last_modified: T.Optional[str]
+    result: T.Any
+
+
+def get_response(url: str, timeout: int = 10, headers: T.Optional[dict[str, str]] = None) -> Response:
+    """GET url expecting status 200 (or 304 for conditional requests), goes through recording/replaying archive"""
+    archive = _ARCHIVE
+    if archive is not None and archive.mode == _REPLAY:
+        return Response(status=200, text=archive.get(url))
+    import requests
+
     logger.debug("Send request to %s", url)
-    response = requests.get(url, timeout=timeout)
-    assert response.status_code == 200
+    response = requests.get(url, timeout=timeout, headers=headers)
+    assert response.status_code in (200, _NOT_MODIFIED), f"Status {response.status_code} for {url}"
+    if archive is not None:
+        assert response.status_code == 200, f"Conditional request {url} can't be recorded"
+        archive.add(url, response.text)
+        return Response(status=200, text=response.text)
+    return Response(
+        status=response.status_code,
+        text=response.text,
+        etag=response.headers.get("ETag"),
+        last_modified=response.headers.get("Last-Modified"),
+    )
+
+
+def get_text(url: str, timeout: int = 10, headers: T.Optional[dict[str, str]] = None) -> str:
+    """GET url and return response text, goes through recording/replaying archive"""
+    return get_response(url, timeout=timeout, headers=headers).text
+
+
+def _conditional_headers(validated: T.Optional[_Validated]) -> T.Optional[dict[str, str]]:
+    if validated is None:
+        return None
+    headers = {}
+    if validated.etag is not None:
+        headers["If-None-Match"] = validated.etag
+    if validated.last_modified is not None:
+        headers["If-Modified-Since"] = validated.last_modified
+    return headers
+
+
+class CacheBackend(T.Protocol):
+    """Cache of parsed responses shared between processes or machines"""
+    def get(self, url: str) -> T.Any:
+        """Cached response or None"""
+
+    def set(self, url: str, result: T.Any) -> None:
+        ...
+
+    def lock(self, url: str) -> T.ContextManager[None]:
+        """Held by one fetcher of url at a time"""
+
+
+_CACHE_BACKEND: T.Optional[CacheBackend] = None
+
+
+def set_cache_backend(backend: T.Optional[CacheBackend]) -> None:
+    """Look up responses missing in memory in backend before requesting ISS, None disables it"""
+    global _CACHE_BACKEND
+    _CACHE_BACKEND = backend
+
+
+def _fetch(url: str, timeout: int) -> T.Any:
+    # archived responses have no validators, so revalidate only real requests
+    validated = _VALIDATED_TABLE.get(url) if _ARCHIVE is None else None
+    response = get_response(url, timeout=timeout, headers=_conditional_headers(validated))
+    if response.status == _NOT_MODIFIED:
+        assert validated is not None, f"Unexpected status {response.status} for {url}"
+        logger.debug("Not modified %s", url)
+        _VALIDATED_TABLE.move_to_end(url)
+        return validated.result
     result = json.loads(response.text)
+    if response.etag is not None or response.last_modified is not None:
+        _VALIDATED_TABLE[url] = _Validated(etag=response.etag, last_modified=response.last_modified, result=result)
+        _VALIDATED_TABLE.move_to_end(url)
+        if len(_VALIDATED_TABLE) > _VALIDATED_SIZE:
+            _VALIDATED_TABLE.popitem(last=False)
+    else:
+        _VALIDATED_TABLE.pop(url, None)
+    return result
+
+
+def _fetch_shared(backend: CacheBackend, url: str, timeout: int, use_cache: bool) -> T.Any:
+    """Single-flight fetch: whoever holds the lock requests ISS, the others find its response in backend"""
+    result = backend.get(url) if use_cache else None
+    if result is not None:
+        return result
+    with backend.lock(url):
+        result = backend.get(url) if use_cache else None
+        if result is None:
+            result = _fetch(url, timeout)
+            backend.set(url, result)
+    return result
+
+
+def _cached_request(url: str, timeout: int = 10, use_cache: bool = True) -> T.Any:
+    if use_cache and url in _CACHED_TABLE:
+        _CACHED_TABLE.move_to_end(url)
+        return _CACHED_TABLE[url]
+    # recorded and replayed runs must not depend on responses of other runs
+    backend = _CACHE_BACKEND if _ARCHIVE is None else None
+    if backend is None:
+        result = _fetch(url, timeout)
+    else:
+        result = _fetch_shared(backend, url, timeout, use_cache)
     _CACHED_TABLE[url] = result
+    _CACHED_TABLE.move_to_end(url)
     if len(_CACHED_TABLE) > _CACHE_SIZE:
         _CACHED_TABLE.popitem(last=False)
     return result
 
 
-def json_api_call(url: str, retries: int = 10, timeout: int = 10, wait: int = 10) -> T.Any:
+def json_api_call(
+    url: str,
+    retries: int = 10,
+    timeout: int = 10,
+    wait: int = 10,
+    use_cache: bool = True,
+) -> T.Any:
+    """Call ISS API; use_cache=False always asks server and refreshes cached response"""
     last_ex = None
     for _ in range(retries):
         try:
-            return _cached_request(url, timeout=timeout)
+            return _cached_request(url, timeout=timeout, use_cache=use_cache)
+        except ReplayMiss:
+            raise
         except Exception as ex:
             last_ex = ex
             time.sleep(wait)
@@ -55,5 +264,34 @@ def json_api_call(url: str, retries: int = 10, timeout: int = 10, wait: int = 10
     raise last_ex
 
 
+def iss_params(blocks: dict[str, T.Optional[list[str]]]) -> str:
+    """
+    Query parameters asking ISS only for given blocks and columns (None means all columns)
+
+    iss_params({"history": ["TRADEDATE", "CLOSE"]}) ->
+    "iss.meta=off&iss.only=history&history.columns=TRADEDATE,CLOSE"
+    """
+    params = ["iss.meta=off", f"iss.only={','.join(blocks)}"]
+    for block, columns in blocks.items():
+        if columns is not None:
+            params.append(f"{block}.columns={','.join(columns)}")
+    return "&".join(params)
+
+
 def prepare_dict(response: T.Any, name: str) -> list[dict[str, T.Any]]:
     return [{key: value for key, value in zip(response[name]["columns"], line)} for line in response[name]["data"]]
+
+
+def prepare_columns(response: T.Any, name: str, columns: list[str]) -> dict[str, "np.ndarray"]:
+    """Return object arrays of given columns of response block, missing columns are filled with None"""
+    import numpy as np
+
+    block = response[name]
+    data = np.array(block["data"], dtype=object).reshape(len(block["data"]), len(block["columns"]))
+    result = {}
+    for column in columns:
+        if column in block["columns"]:
+            result[column] = data[:, block["columns"].index(column)]
+        else:
+            result[column] = np.full(len(data), None, dtype=object)
+    return result
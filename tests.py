@@ -1,8 +1,19 @@
 #!/usr/bin/env python3
+import concurrent.futures
+import dataclasses
 import datetime
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
 import unittest
+import zlib
 from unittest import mock
 
+import numpy as np
+
 import moexapi
 
 
@@ -15,6 +26,19 @@ class Tickers(unittest.TestCase):
         with self.assertRaises(moexapi.NotFindTicker):
             moexapi.get_ticker("TMOS", market=moexapi.Markets.SHARES)
 
+    def test_record_date(self):
+        bond = _bond(_bondization(_RECORD_DATE_BONDIZATION))
+        self.assertEqual(bond.coupons[0].date, datetime.date(2024, 7, 1))
+        self.assertEqual(bond.coupons[0].record_date, datetime.date(2024, 6, 28))
+        self.assertEqual(bond.next_coupon(datetime.date(2024, 6, 29)).date, datetime.date(2024, 7, 1))
+        # period runs till coupon date, not record date
+        self.assertAlmostEqual(bond.accrued_interest(datetime.date(2024, 4, 1)), 50.0 * 91 / 182)
+        self.assertAlmostEqual(bond.accrued_interest(datetime.date(2024, 6, 30)), 50.0 * 181 / 182)
+        self.assertEqual(bond.accrued_interest(datetime.date(2024, 7, 1)), 0.0)
+        cashflows = bond.cashflows_between(datetime.date(2024, 6, 30), datetime.date(2024, 7, 1))
+        self.assertEqual([(item.date, item.coupon) for item in cashflows], [(datetime.date(2024, 7, 1), 50.0)])
+        self.assertEqual(bond.cashflows_between(datetime.date(2024, 6, 28), datetime.date(2024, 6, 30)), [])
+
     def test_bonds(self):
         moexapi.get_ticker(secid='RU000A0JXYA7', market=moexapi.Markets.BONDS)
 
@@ -100,6 +124,355 @@ class Tickers(unittest.TestCase):
             )
         self.assertEqual(info.boards, ["TQBR", "TQTF"])
 
+    def test_lazy(self):
+        listing = moexapi.Listing(
+            secid="SBER",
+            market=moexapi.Markets.SHARES,
+            shortname="Сбербанк",
+            isin="RU0009029540",
+            board="TQBR",
+            is_traded=True,
+        )
+        ticker = moexapi.Ticker(
+            secid="SBER",
+            alias="SBER",
+            is_traded=True,
+            market=moexapi.Markets.SHARES,
+            shortname="Сбербанк",
+            isin="RU0009029540",
+            subtype=None,
+            listlevel=1,
+            boards=["TQBR"],
+            price=300.0,
+        )
+        with (
+            mock.patch("moexapi.tickers._parse_tickers", return_value=[listing]),
+            mock.patch.object(moexapi.Ticker, "from_listing", return_value=ticker) as from_listing,
+        ):
+            tickers = moexapi.get_tickers(moexapi.Markets.SHARES, lazy=True)
+            self.assertEqual(tickers[0].secid, "SBER")
+            self.assertEqual(tickers[0].market, moexapi.Markets.SHARES)
+            self.assertEqual(
+                repr(tickers[0]),
+                f"LazyTicker(secid='SBER', alias='SBER', is_traded=True, market={moexapi.Markets.SHARES!r}, shortname='Сбербанк')",
+            )
+            from_listing.assert_not_called()
+            self.assertEqual(tickers[0].boards, ["TQBR"])
+            self.assertEqual(tickers[0].price, 300.0)
+            moexapi.materialize_tickers(tickers)
+            from_listing.assert_called_once_with(listing)
+            # eager tickers are loaded the same way
+            self.assertEqual(moexapi.get_tickers(moexapi.Markets.SHARES), [ticker])
+            self.assertEqual(from_listing.call_args_list[-1].args, (listing,))
+
+        def slow_from_listing(listing):
+            time.sleep(0.05)
+            return ticker
+
+        lazy = moexapi.LazyTicker(listing)
+        with (
+            mock.patch.object(moexapi.Ticker, "from_listing", side_effect=slow_from_listing) as from_listing,
+            concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor,
+        ):
+            prices = list(executor.map(lambda _: lazy.price, range(4)))
+        self.assertEqual(prices, [300.0] * 4)
+        self.assertEqual(from_listing.call_count, 1)
+
+    def test_universe(self):
+        listing = moexapi.Listing(
+            secid="SBER",
+            market=moexapi.Markets.SHARES,
+            shortname="Сбербанк",
+            isin="RU0009029540",
+            board="TQBR",
+            is_traded=True,
+        )
+        ticker = moexapi.Ticker(
+            secid="SBER",
+            alias="SBER",
+            is_traded=True,
+            market=moexapi.Markets.SHARES,
+            shortname="Сбербанк",
+            isin="RU0009029540",
+            subtype=None,
+            listlevel=1,
+            boards=["TQBR", "SPEQ"],
+            currency="RUB",
+            price=300.0,
+            listed_till=datetime.date.min,
+        )
+        universe = moexapi.Universe(
+            listings=[listing],
+            tickers=[ticker],
+            changeovers=[moexapi.Changeover(date=datetime.date(2023, 9, 20), old_secid="SFTL", new_secid="SOFL")],
+            splits=[moexapi.Split(date=datetime.date(2021, 4, 12), secid="VTBU", mult=40.0)],
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "universe.npz")
+            moexapi.save_universe(universe, path)
+            try:
+                loaded = moexapi.load_universe(path)
+                self.assertEqual(loaded, universe)
+                with mock.patch("moexapi.tickers.utils.json_api_call") as api_call:
+                    self.assertEqual(moexapi.get_ticker("SBER"), ticker)
+                    self.assertEqual(len(moexapi.get_changeovers()), 1)
+                api_call.assert_not_called()
+            finally:
+                moexapi.install_universe(None)
+
+    def test_export_universe(self):
+        listing = moexapi.Listing(
+            secid="SBER", market=moexapi.Markets.SHARES, shortname="Сбербанк", isin="RU0009029540", board="TQBR",
+            is_traded=True,
+        )
+        ticker = moexapi.Ticker(
+            secid="SBER", alias="SBER", is_traded=True, market=moexapi.Markets.SHARES, shortname="Сбербанк",
+            isin="RU0009029540", subtype=None, listlevel=1, boards=["TQBR"], currency="RUB", price=300.0,
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            with (
+                mock.patch("moexapi.tickers._parse_tickers", return_value=[listing]),
+                mock.patch("moexapi.tickers.Ticker.from_listing", return_value=ticker),
+                mock.patch("moexapi.changeover.get_changeovers", return_value=[]),
+                mock.patch("moexapi.splits.get_splits", return_value=[]),
+            ):
+                universe = moexapi.export_universe(os.path.join(directory, "universe.npz"))
+            self.assertIs(type(universe.tickers[0]), moexapi.Ticker)
+            moexapi.install_universe(universe)
+            try:
+                with mock.patch("moexapi.tickers.utils.json_api_call") as api_call:
+                    loaded = moexapi.get_ticker("SBER")
+                api_call.assert_not_called()
+                self.assertEqual(loaded, ticker)
+                loaded.boards.append("SPEQ")
+                self.assertEqual(universe.tickers[0].boards, ["TQBR"])
+            finally:
+                moexapi.install_universe(None)
+
+    def test_partial_universe(self):
+        listing = moexapi.Listing(
+            secid="SBER", market=moexapi.Markets.SHARES, shortname="Сбербанк", isin="RU0009029540", board="TQBR",
+            is_traded=True,
+        )
+        bond_page = [{
+            "secid": "SU26238RMFS4", "shortname": "ОФЗ 26238", "isin": "RU000A1038V6", "primary_boardid": "TQOB",
+            "is_traded": 1, "name": "ОФЗ-ПД 26238", "type": "ofz_bond",
+        }]
+
+        def pages(market):
+            return [bond_page] if market == moexapi.Markets.FEDERAL_BONDS else [[]]
+
+        universe = moexapi.Universe(listings=[listing], tickers=[], changeovers=[], splits=[], market=moexapi.Markets.SHARES)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "universe.npz")
+            moexapi.save_universe(universe, path)
+            try:
+                self.assertEqual(moexapi.load_universe(path), universe)
+                with mock.patch("moexapi.tickers._fetch_listing_pages", side_effect=pages) as fetch:
+                    self.assertEqual(moexapi.tickers._parse_tickers(moexapi.Markets.SHARES), [listing])
+                    fetch.assert_not_called()
+                    listings = moexapi.tickers._parse_tickers(moexapi.Markets.ALL)
+                self.assertEqual([item.secid for item in listings], ["SBER", "SU26238RMFS4"])
+                self.assertNotIn(moexapi.Markets.SHARES, [args[0] for args, _ in fetch.call_args_list])
+            finally:
+                moexapi.install_universe(None)
+
+    def test_search(self):
+        def listing(secid, shortname, isin, name, market=moexapi.Markets.SHARES, is_traded=True):
+            return moexapi.Listing(
+                secid=secid, market=market, shortname=shortname, isin=isin, board="TQBR", is_traded=is_traded, name=name,
+            )
+
+        listings = [
+            listing("GAZP", "ГАЗПРОМ ао", "RU0007661625", "Газпром ПАО ао"),
+            listing("GAZA", "ГАЗ ао", "RU0009034268", "Горьковский автомобильный завод ПАО ао"),
+            listing("SU26238RMFS4", "ОФЗ 26238", "RU000A1038V6", "ОФЗ-ПД 26238 15/05/2041", moexapi.Markets.FEDERAL_BONDS),
+            listing("SU26230RMFS1", "ОФЗ 26230", "RU000A100EF5", "ОФЗ-ПД 26230 16/03/39", moexapi.Markets.FEDERAL_BONDS),
+            listing("MRKY", "Россети ЮГ", "RU000A0JPPG8", "Россети Юг ПАО ао", is_traded=False),
+        ]
+        index = moexapi.SearchIndex(listings)
+        self.assertEqual([item.secid for item in index.search("газпр")], ["GAZP"])
+        self.assertEqual([item.secid for item in index.search("GAZ")], ["GAZA", "GAZP"])
+        self.assertEqual([item.secid for item in index.search("ОФЗ 262")], ["SU26230RMFS1", "SU26238RMFS4"])
+        self.assertEqual([item.secid for item in index.search("ofz", limit=1)], [])
+        self.assertEqual([item.secid for item in index.search("1038v")], ["SU26238RMFS4"])
+        self.assertEqual([item.secid for item in index.search("россёти юк")], ["MRKY"])
+        self.assertEqual(index.search("ОФЗ", market=moexapi.Markets.SHARES), [])
+        self.assertEqual([item.secid for item in index.search("г")], ["GAZA", "GAZP"])
+        index.update(listings[1:4] + [listing("GAZP", "ГАЗПРОМ ао", "RU0007661625", "Газпром", is_traded=False)])
+        self.assertEqual(len(index), 4)
+        self.assertFalse(index.search("газпром")[0].is_traded)
+        self.assertEqual(index.search("россети"), [])
+        self.assertFalse(index.remove("MRKY", moexapi.Markets.SHARES))
+        # duplicates in bulk build keep the last listing and leave a consistent index
+        index = moexapi.SearchIndex(listings + [listing("GAZP", "ГАЗПРОМ ао", "RU0007661625", "Газпром", is_traded=False)])
+        self.assertEqual(len(index), 5)
+        self.assertFalse(index.search("газпром")[0].is_traded)
+        for item in listings:
+            self.assertTrue(index.remove(item.secid, item.market))
+        self.assertEqual(index.search("г"), [])
+
+    def test_parse_tickers_pages(self):
+        columns = ["secid", "shortname", "isin", "type", "primary_boardid", "is_traded"]
+
+        def api_call(url):
+            start = int(url.split("start=")[1])
+            data = [
+                [f"S{idx}", f"S {idx}", f"RU{idx}", "exchange_ppif", "TQTF", 1]
+                for idx in range(start, min(start + 100, 250))
+            ]
+            return {"securities": {"columns": columns, "data": data}}
+
+        with mock.patch("moexapi.tickers.utils.json_api_call", side_effect=api_call) as json_api_call:
+            listings = moexapi.tickers._parse_tickers(moexapi.Markets.ETFS)
+        self.assertEqual([listing.secid for listing in listings], [f"S{idx}" for idx in range(250)])
+        self.assertLessEqual(json_api_call.call_count, 1 + moexapi.tickers._LISTING_PREFETCH)
+
+    def test_snapshot(self):
+        response = {
+            "securities": {
+                "columns": ["SECID", "BOARDID", "SHORTNAME", "PREVPRICE", "ACCRUEDINT", "FACEVALUEONSETTLEDATE", "FACEUNIT", "CURRENCYID"],
+                "data": [
+                    ["AAA", "TQCB", "AAA 01", 99.0, 5.0, 1000, "SUR", "SUR"],
+                    ["BBB", "TQCB", "BBB 01", 50.0, 1.0, 100, "USD", "USD"],
+                ],
+            },
+            "marketdata": {
+                "columns": ["LAST", "VALTODAY"],
+                "data": [[101.0, 1000], [None, 0]],
+            },
+        }
+        with (
+            mock.patch("moexapi.tickers.utils.json_api_call", return_value=response) as api_call,
+            mock.patch("moexapi.tickers.exchange.get_rate", return_value=90.0) as get_rate,
+        ):
+            snapshot = moexapi.get_snapshot(moexapi.Markets.COMPANY_BONDS)
+        self.assertEqual(api_call.call_count, 1)
+        self.assertEqual(get_rate.call_count, 1)
+        self.assertEqual([item.secid for item in snapshot], ["AAA", "BBB"])
+        self.assertAlmostEqual(snapshot[0].price, 1015.0)
+        self.assertAlmostEqual(snapshot[0].price_in_rub, 1015.0)
+        self.assertEqual(snapshot[1].raw_price, 50.0)
+        self.assertAlmostEqual(snapshot[1].price_in_rub, 51.0 * 90.0)
+
+    def test_snapshot_security_types(self):
+        security_types = {
+            "securitytypes": {
+                "columns": ["trade_engine_name", "security_type_name", "stock_type"],
+                "data": [
+                    ["stock", "common_share", "1"],
+                    ["stock", "preferred_share", "2"],
+                    ["stock", "depositary_receipt", "D"],
+                    ["stock", "exchange_ppif", "9"],
+                    ["futures", "futures", "F"],
+                ],
+            },
+        }
+        securities = {
+            "securities": {
+                "columns": ["SECID", "BOARDID", "SHORTNAME", "PREVPRICE", "CURRENCYID", "SECTYPE"],
+                "data": [
+                    ["AAA", "TQBR", "AAA", 10.0, "SUR", "1"],
+                    ["AAAP", "TQBR", "AAA-p", 9.0, "SUR", "2"],
+                    ["FUND", "TQTF", "FUND", 1.0, "SUR", "9"],
+                ],
+            },
+            "marketdata": {
+                "columns": ["LAST", "VALTODAY"],
+                "data": [[11.0, 100], [None, 0], [1.5, 10]],
+            },
+        }
+
+        def api_call(url):
+            return security_types if "/securitytypes.json" in url else securities
+
+        with mock.patch("moexapi.tickers.utils.json_api_call", side_effect=api_call) as call:
+            snapshot = moexapi.get_snapshot(moexapi.Markets.SHARES)
+        urls = [args[0] for args, _ in call.call_args_list]
+        self.assertFalse(any("/iss/securities.json" in url for url in urls))
+        self.assertEqual(len(urls), 2)
+        self.assertEqual([item.secid for item in snapshot], ["AAA", "AAAP"])
+        self.assertEqual(snapshot[0].price, 11.0)
+
+    def test_snapshot_boards(self):
+        response = {
+            "securities": {"columns": ["SECID", "BOARDID", "PREVPRICE", "CURRENCYID"], "data": []},
+            "marketdata": {"columns": ["LAST", "VALTODAY"], "data": []},
+        }
+        with mock.patch("moexapi.tickers.utils.json_api_call", return_value=response) as call:
+            moexapi.get_snapshot(moexapi.Markets.BONDS, boards=["TQOB"])
+        urls = [args[0] for args, _ in call.call_args_list]
+        self.assertEqual(len(urls), 1)
+        self.assertIn("/markets/bonds/boards/TQOB/securities.json", urls[0])
+
+
+def _bondization(response):
+    """Side effect of json_api_call paging bondization blocks of response by one line"""
+    def api_call(url):
+        block = url.split("iss.only=")[1].split(",")[0]
+        data = response[block]["data"]
+        start = int(url.split("start=")[1].split("&")[0])
+        return {
+            block: {"columns": response[block]["columns"], "data": data[start:start + 1]},
+            f"{block}.cursor": {"columns": ["INDEX", "TOTAL", "PAGESIZE"], "data": [[start, len(data), 1]]},
+        }
+
+    return api_call
+
+
+def _bond(bondization):
+    info = {
+        "NAME": "Test bond",
+        "ISSUEDATE": "2024-01-01",
+        "MATDATE": "2025-01-01",
+        "INITIALFACEVALUE": "1000",
+        "ISSUESIZE": "1000",
+        "FACEVALUE": "1000",
+        "ISQUALIFIEDINVESTORS": "0",
+    }
+    ticker = mock.Mock(secid="AAA", shortname="AAA")
+    with (
+        mock.patch("moexapi.bonds.tickers.get_ticker_info_dict", return_value=info),
+        mock.patch("moexapi.bonds.utils.json_api_call", side_effect=bondization),
+    ):
+        return moexapi.Bond(ticker)
+
+
+_RECORD_DATE_BONDIZATION = {
+    "amortizations": {"columns": ["amortdate", "value", "initialfacevalue"], "data": [["2025-01-01", 1000, 1000]]},
+    "coupons": {
+        "columns": ["coupondate", "recorddate", "startdate", "value", "initialfacevalue"],
+        "data": [
+            ["2024-07-01", "2024-06-28", "2024-01-01", 50.0, 1000],
+            ["2025-01-01", "2024-12-28", "2024-07-01", 40.0, 1000],
+        ],
+    },
+    "offers": {"columns": ["offerdate", "value"], "data": []},
+}
+
+
+class _BackfillLoader:
+    """Picklable backfill loader, February fails till allow file appears in directory"""
+    def __init__(self, directory):
+        self.directory = directory
+
+    def __call__(self, unit):
+        if unit.start_date.month == 2 and not os.path.exists(os.path.join(self.directory, "allow")):
+            raise RuntimeError("ISS is down")
+        start = datetime.datetime.combine(unit.start_date, datetime.time())
+        return [
+            moexapi.Candle(
+                start=start,
+                end=start + datetime.timedelta(hours=23),
+                low=1.0,
+                high=2.0,
+                open=1.0,
+                close=2.0,
+                volume=10,
+                value=15.0,
+            )
+        ]
+
 
 class Candles(unittest.TestCase):
     def test_batch(self):
@@ -118,6 +491,225 @@ class Candles(unittest.TestCase):
         self.assertEqual(result, [["AAA"], ["BBB"]])
         self.assertEqual(get_candles.call_count, 2)
 
+    def test_resample(self):
+        start = datetime.datetime(2024, 1, 8, 10, 0)
+        candles = [
+            moexapi.Candle(
+                start=start + datetime.timedelta(minutes=idx),
+                end=start + datetime.timedelta(minutes=idx, seconds=59),
+                low=100.0 + idx,
+                high=102.0 + idx,
+                open=101.0 + idx,
+                close=101.5 + idx,
+                volume=10,
+                value=1000.0,
+            )
+            for idx in range(30)
+        ]
+        result = moexapi.resample_candles(candles, datetime.timedelta(minutes=15))
+        self.assertEqual(len(result), 2)
+        self.assertEqual(result[0].start, start)
+        self.assertEqual(result[0].end, datetime.datetime(2024, 1, 8, 10, 14, 59))
+        self.assertEqual(result[1].start, datetime.datetime(2024, 1, 8, 10, 15))
+        self.assertEqual((result[0].low, result[0].high), (100.0, 116.0))
+        self.assertEqual((result[1].open, result[1].close), (116.0, 130.5))
+        self.assertEqual(result[0].volume, 150)
+        columns = moexapi.resample_candles(
+            moexapi.CandleColumns.from_candles(candles),
+            datetime.timedelta(days=7),
+        )
+        self.assertEqual(len(columns), 1)
+        self.assertEqual(columns.start[0], np.datetime64("2024-01-08T00:00:00"))
+        self.assertAlmostEqual(columns.value[0], 30000.0)
+
+    def test_parse_candles_columns(self):
+        columns = ["open", "close", "high", "low", "value", "volume", "begin", "end"]
+        responses = [
+            {"candles": {"columns": columns, "data": [
+                [10, 11, 12, 9, 100, 10, "2024-01-08 10:00:00", "2024-01-08 10:00:59"],
+                [0, 0, 0, 0, 0, 0, "2024-01-08 10:01:00", "2024-01-08 10:01:59"],
+                [11, None, 12, 11, 50, 5, "2024-01-08 10:02:00", "2024-01-08 10:02:59"],
+            ]}},
+            {"candles": {"columns": columns, "data": []}},
+        ]
+        ticker = mock.Mock(secid="AAA", market=moexapi.Markets.SHARES)
+        with mock.patch("moexapi.candles.utils.json_api_call", side_effect=responses) as api_call:
+            candles = moexapi.candles._parse_candles_one_board_columns(ticker, "TQBR", interval=1)
+        self.assertEqual(candles.start.dtype, np.dtype("datetime64[s]"))
+        self.assertEqual(list(candles.start), [np.datetime64("2024-01-08T10:00:00")])
+        self.assertEqual(list(candles.close), [11.0])
+        self.assertIn("from=2024-01-08T10:02:59", api_call.call_args_list[1].args[0])
+
+    def test_poller(self):
+        columns = ["open", "close", "high", "low", "value", "volume", "begin", "end"]
+
+        def page(*rows):
+            return {"candles": {"columns": columns, "data": list(rows)}}
+
+        responses = [
+            page(
+                [10, 11, 12, 9, 100, 10, "2024-01-08 10:00:00", "2024-01-08 10:00:59"],
+                [11, 12, 12, 11, 50, 5, "2024-01-08 10:01:00", "2024-01-08 10:01:59"],
+            ),
+            page(),
+            page(
+                [11, 13, 13, 11, 80, 8, "2024-01-08 10:01:00", "2024-01-08 10:01:59"],
+                [13, 14, 14, 13, 20, 2, "2024-01-08 10:02:00", "2024-01-08 10:02:59"],
+            ),
+            page(),
+            page(
+                [13, 14, 14, 13, 20, 2, "2024-01-08 10:02:00", "2024-01-08 10:02:59"],
+                [14, 15, 15, 14, 30, 2, "2024-01-08 10:03:00", "2024-01-08 10:03:59"],
+            ),
+            page(),
+        ]
+        ticker = mock.Mock(secid="AAA", boards=["TQBR"], market=moexapi.Markets.SHARES)
+        poller = moexapi.CandlePoller([ticker], start_date=datetime.date(2024, 1, 8))
+        with mock.patch("moexapi.candles.utils.json_api_call", side_effect=responses) as api_call:
+            first = poller.poll()
+            second = poller.poll()
+            third = poller.poll()
+        self.assertEqual([update.is_complete for update in first], [True, False])
+        self.assertEqual([update.candle.close for update in second], [13, 14])
+        self.assertEqual([update.is_complete for update in second], [True, False])
+        self.assertIn("from=2024-01-08T10:01:00", api_call.call_args_list[2].args[0])
+        self.assertFalse(api_call.call_args_list[2].kwargs["use_cache"])
+        # unchanged forming candle is emitted again as complete when the next one appears
+        self.assertEqual([update.candle.close for update in third], [14, 15])
+        self.assertEqual([update.is_complete for update in third], [True, False])
+
+    def test_gaps(self):
+        def bars(day, minutes):
+            return [
+                moexapi.Candle(
+                    start=datetime.datetime(2024, 1, day, 10, minute),
+                    end=datetime.datetime(2024, 1, day, 10, minute + 9, 59),
+                    low=1.0, high=2.0, open=1.0, close=2.0, volume=1, value=2.0,
+                )
+                for minute in minutes
+            ]
+
+        full = range(0, 60, 10)
+        stored = bars(8, full) + bars(9, [0, 10, 40, 50]) + bars(11, full)
+        # by default only days with candles are checked
+        self.assertEqual(
+            moexapi.find_candle_gaps(stored, interval=10),
+            [moexapi.Gap(datetime.datetime(2024, 1, 9, 10, 20), datetime.datetime(2024, 1, 9, 10, 30), 2)],
+        )
+        # another board traded on the 10th, so the day is missing
+        calendar = moexapi.trading_days(stored, bars(10, [0]))
+        gaps = moexapi.find_candle_gaps(stored, interval=10, calendar=calendar)
+        self.assertEqual(
+            gaps,
+            [
+                moexapi.Gap(datetime.datetime(2024, 1, 9, 10, 20), datetime.datetime(2024, 1, 9, 10, 30), 2),
+                moexapi.Gap(datetime.datetime(2024, 1, 10, 10, 0), datetime.datetime(2024, 1, 10, 10, 50), 6),
+            ],
+        )
+        self.assertEqual(moexapi.find_candle_gaps(stored, interval=10, calendar=calendar, min_missing=3), gaps[1:])
+
+        def parse(ticker, board, start_date=None, end_date=None, interval=None, use_cache=True):
+            day = bars(start_date.day, range(start_date.minute, end_date.minute + 1, 10))
+            return moexapi.CandleColumns.from_candles(day)
+
+        ticker = mock.Mock(secid="AAA", market=moexapi.Markets.SHARES)
+        with mock.patch("moexapi.candles._parse_candles_one_board_columns", side_effect=parse) as parse_mock:
+            repaired = moexapi.repair_candles(ticker, "TQBR", stored, interval=10, calendar=calendar)
+        self.assertEqual(parse_mock.call_count, 2)
+        self.assertEqual(parse_mock.call_args_list[0].kwargs["end_date"], datetime.datetime(2024, 1, 9, 10, 39, 59))
+        self.assertEqual(len(repaired), 24)
+        self.assertEqual(moexapi.find_candle_gaps(repaired, interval=10, calendar=calendar), [])
+
+        history = [
+            moexapi.History(date=datetime.date(2024, 1, day), low=1, high=2, open=1, close=2, mid_price=1.5, numtrades=1, volume=1, value=2)
+            for day in [8, 9, 12, 15]
+        ]
+        self.assertEqual(moexapi.find_history_gaps(history), [])
+        self.assertEqual(
+            moexapi.find_history_gaps(history, calendar=moexapi.weekday_calendar(datetime.date(2024, 1, 8), datetime.date(2024, 1, 15))),
+            [moexapi.Gap(datetime.date(2024, 1, 10), datetime.date(2024, 1, 11), 2)],
+        )
+        # the 11th is a holiday as nobody traded then
+        other = moexapi.HistoryColumns.from_history(history + [dataclasses.replace(history[0], date=datetime.date(2024, 1, 10))])
+        self.assertEqual(
+            moexapi.find_history_gaps(history, calendar=moexapi.trading_days(history, other)),
+            [moexapi.Gap(datetime.date(2024, 1, 10), datetime.date(2024, 1, 10), 1)],
+        )
+
+    def test_archive(self):
+        def bars(first, last):
+            start = datetime.datetime(2024, 1, 8, 10)
+            return [
+                moexapi.Candle(
+                    start=start + datetime.timedelta(minutes=idx),
+                    end=start + datetime.timedelta(minutes=idx, seconds=59),
+                    low=idx, high=idx, open=idx, close=idx, volume=idx, value=idx,
+                )
+                for idx in range(first, last)
+            ]
+
+        key = "AAA/TQBR/1"
+        with tempfile.TemporaryDirectory() as directory, mock.patch("moexapi.archive._INDEX_STEP", 4):
+            archive = moexapi.CandleArchive(directory)
+            self.assertEqual(len(archive.read(key)), 0)
+            self.assertEqual(archive.append(key, bars(0, 10)), 10)
+            update = bars(5, 20)
+            update[4].close = 99.0
+            self.assertEqual(archive.append(key, update), 11)
+            self.assertEqual((archive.keys(), archive.rows(key)), ([key], 20))
+            closes = [99.0 if idx == 9 else idx for idx in range(20)]
+            columns = archive.read(key)
+            self.assertIsInstance(columns.close, np.memmap)
+            self.assertEqual(list(columns.close), closes)
+            for first in range(21):
+                for last in range(first, 21):
+                    columns = archive.read(
+                        key,
+                        start_date=datetime.datetime(2024, 1, 8, 10, first),
+                        end_date=datetime.datetime(2024, 1, 8, 10, last),
+                    )
+                    self.assertEqual(list(columns.close), closes[first:last + 1])
+            responses = [
+                {"candles": {"columns": ["begin", "end", "low", "high", "open", "close", "volume", "value"], "data": [
+                    ["2024-01-08 10:19:00", "2024-01-08 10:19:59", 19, 21, 19, 21, 5, 100],
+                    ["2024-01-08 10:20:00", "2024-01-08 10:20:59", 21, 21, 21, 21, 1, 21],
+                ]}},
+                {"candles": {"columns": [], "data": []}},
+            ]
+            ticker = mock.Mock(secid="AAA", market=moexapi.Markets.SHARES)
+            with mock.patch("moexapi.candles.utils.json_api_call", side_effect=responses) as api_call:
+                self.assertEqual(archive.update(key, ticker, "TQBR", interval=1), 2)
+            self.assertIn("from=2024-01-08T10:19:00", api_call.call_args_list[0].args[0])
+            self.assertEqual(list(archive.read(key, start_date=datetime.datetime(2024, 1, 8, 10, 18)).close), [18, 21, 21])
+
+    def test_backfill(self):
+        ticker = mock.Mock(secid="AAA", boards=["TQBR"], market=moexapi.Markets.SHARES)
+        units = moexapi.plan_backfill(
+            [ticker],
+            datetime.date(2024, 1, 1),
+            datetime.date(2024, 2, 15),
+            interval=24,
+            chunk=datetime.timedelta(days=31),
+        )
+        self.assertEqual(
+            [(unit.start_date, unit.end_date) for unit in units],
+            [
+                (datetime.date(2024, 1, 1), datetime.date(2024, 1, 31)),
+                (datetime.date(2024, 2, 1), datetime.date(2024, 2, 15)),
+            ],
+        )
+        # loader is passed to worker processes, so the test does not depend on fork start method
+        with tempfile.TemporaryDirectory() as directory:
+            loader = _BackfillLoader(directory)
+            report = moexapi.run_backfill(directory, units, max_workers=1, loader=loader)
+            self.assertEqual(len(report.done), 1)
+            self.assertEqual(len(report.failed), 1)
+            open(os.path.join(directory, "allow"), "w").close()
+            report = moexapi.run_backfill(directory, max_workers=1, loader=loader)
+            self.assertEqual(len(report.done), 2)
+            candles = moexapi.load_backfill(directory, "AAA")
+        self.assertEqual([candle.start.date() for candle in candles], [datetime.date(2024, 1, 1), datetime.date(2024, 2, 1)])
+
     def test_index(self):
         ticker = moexapi.get_ticker("IMOEX")
         candles = moexapi.get_candles(
@@ -165,6 +757,35 @@ class Candles(unittest.TestCase):
         self.assertGreater(len(candles), 0)
         self.assertGreater(len(history), 0)
 
+    def test_parse_history(self):
+        columns = ["BOARDID", "TRADEDATE", "NUMTRADES", "VALUE", "OPEN", "LOW", "HIGH", "CLOSE", "WAPRICE", "VOLUME"]
+        cursor = ["INDEX", "TOTAL", "PAGESIZE"]
+        pages = [
+            {"history": {"columns": columns, "data": [
+                ["TQBR", "2024-01-09", 10, 1000.0, 10, 9, 11, 10.5, 10.2, 100],
+                ["SMAL", "2024-01-09", 1, None, 12, 12, 12, 12, None, 1],
+                ["TQBR", "2024-01-10", 0, 0, 0, 0, 0, 0, 0, 0],
+                ["TQBR", "2024-01-11", 5, 50.0, 5, 5, 5, 5, None, None],
+            ]}, "history.cursor": {"columns": cursor, "data": [[0, 5, 4]]}},
+            {"history": {"columns": columns, "data": [
+                ["TQBR", "2024-01-12", 5, 50.0, 5, 5, 5, 5, None, None],
+            ]}, "history.cursor": {"columns": cursor, "data": [[4, 5, 4]]}},
+        ]
+        ticker = mock.Mock(secid="AAA", market=moexapi.Markets.SHARES)
+        with mock.patch("moexapi.history.utils.json_api_call", side_effect=pages) as api_call:
+            history = moexapi.history._parse_history(ticker)
+        self.assertEqual(
+            [item.date for item in history],
+            [datetime.date(2024, 1, 9), datetime.date(2024, 1, 11), datetime.date(2024, 1, 12)],
+        )
+        self.assertEqual(api_call.call_count, 2)
+        self.assertIn("start=4", api_call.call_args_list[1].args[0])
+        self.assertEqual((history[0].low, history[0].high), (9.0, 12.0))
+        self.assertAlmostEqual(history[0].open, 11.0)
+        self.assertAlmostEqual(history[0].mid_price, 11.1)
+        self.assertEqual((history[0].numtrades, history[0].volume, history[0].value), (11, 101, 1000.0))
+        self.assertEqual((history[1].volume, history[1].value, history[1].numtrades), (None, 50.0, 5))
+
     def test_midprice(self):
         ticker = moexapi.get_ticker('SU26229RMFS3')
         history = moexapi.get_history(ticker, start_date=datetime.date(2019, 6, 5), end_date=datetime.date(2019, 6, 5))
@@ -172,6 +793,148 @@ class Candles(unittest.TestCase):
         self.assertAlmostEqual(history[0].mid_price, 97.865)
 
 
+class Indicators(unittest.TestCase):
+    def test_indicators(self):
+        start = datetime.datetime(2024, 1, 8, 23, 50)
+        bars = [
+            moexapi.Candle(
+                start=start + datetime.timedelta(minutes=10 * idx),
+                end=start + datetime.timedelta(minutes=10 * idx + 9, seconds=59),
+                low=100.0 + idx - 1,
+                high=100.0 + idx + 1,
+                open=100.0 + idx,
+                close=100.0 + idx,
+                volume=idx + 1,
+                value=(100.0 + idx) * (idx + 1),
+            )
+            for idx in range(40)
+        ]
+        close = np.array([bar.close for bar in bars])
+        expected = [close[0]]
+        for value in close[1:]:
+            expected.append(0.8 * expected[-1] + 0.2 * value)
+        np.testing.assert_allclose(moexapi.ema(bars, span=9), expected)
+        np.testing.assert_allclose(moexapi.sma(close, 4)[3:], close[3:] - 1.5)
+        self.assertTrue(np.isnan(moexapi.sma(close, 4)[:3]).all())
+        np.testing.assert_allclose(moexapi.atr(bars, 5)[4:], 2.0)
+        self.assertTrue(np.all(moexapi.rsi(bars)[14:] == 100.0))
+        session = moexapi.vwap(bars)
+        self.assertEqual(session[0], 100.0)
+        self.assertEqual(session[1], 101.0)
+        self.assertAlmostEqual(session[2], (101.0 * 2 + 102.0 * 3) / 5)
+        for indicator, batch in [
+            (moexapi.SMA(5), moexapi.sma(bars, 5)),
+            (moexapi.EMA(alpha=0.3), moexapi.ema(bars, alpha=0.3)),
+            (moexapi.RSI(3), moexapi.rsi(bars, 3)),
+            (moexapi.ATR(3), moexapi.atr(bars, 3)),
+            (moexapi.VWAP(), session),
+            (moexapi.VWAP(4), moexapi.vwap(bars, 4)),
+            (moexapi.Volatility(5), moexapi.volatility(bars, 5)),
+        ]:
+            parts = [indicator.update(bars[:2]), indicator.update(bars[2:7]), indicator.update(bars[7:])]
+            np.testing.assert_allclose(np.concatenate(parts), batch)
+
+
+class Risk(unittest.TestCase):
+    def test_returns(self):
+        def history(ticker, start_date=None, end_date=None):
+            closes = {"AAA": {8: 100.0, 9: 110.0, 10: 121.0}, "BBB": {9: 50.0, 10: 25.0, 11: 50.0}}[ticker.secid]
+            return [
+                moexapi.History(
+                    date=datetime.date(2024, 1, day), low=close, high=close, open=close, close=close,
+                    mid_price=close, numtrades=1, volume=1, value=close,
+                )
+                for day, close in closes.items()
+            ]
+
+        ticker_list = [mock.Mock(secid="AAA"), mock.Mock(secid="BBB")]
+        with mock.patch("moexapi.history.get_history", side_effect=history):
+            returns = moexapi.get_returns(ticker_list)
+        self.assertEqual(returns.secids, ["AAA", "BBB"])
+        self.assertEqual(list(returns.dates), list(np.arange("2024-01-09", "2024-01-12", dtype="datetime64[D]")))
+        np.testing.assert_allclose(returns.values[:, 0], [np.log(1.1), np.log(1.1), np.nan])
+        np.testing.assert_allclose(returns.values[:, 1], [np.nan, -np.log(2), np.log(2)])
+
+    def test_covariance(self):
+        values = np.random.default_rng(0).normal(size=(300, 4)) @ np.diag([1.0, 2.0, 3.0, 4.0])
+        np.testing.assert_allclose(moexapi.covariance(values, shrinkage=False, chunk=7), np.cov(values.T))
+        values[:100, 0] = np.nan
+        cov = moexapi.covariance(values, shrinkage=False)
+        self.assertAlmostEqual(cov[0, 1], np.cov(values[100:, :2].T)[0, 1])
+        self.assertTrue(np.isnan(moexapi.covariance(values, min_periods=250, shrinkage=False)[0, 1]))
+        shrunk = moexapi.covariance(values)
+        self.assertLess(np.abs(shrunk[1, 2]), np.abs(cov[1, 2]))
+        self.assertTrue(np.all(np.linalg.eigvalsh(shrunk) > 0))
+        corr = moexapi.correlation(shrunk)
+        np.testing.assert_allclose(np.diag(corr), 1.0)
+        self.assertTrue(np.all(np.abs(corr) <= 1.0))
+
+
+class Portfolio(unittest.TestCase):
+    def test_value_portfolio(self):
+        closes = {
+            "AAA": {8: 100.0, 10: 110.0},
+            "BBB": {9: 98.0, 10: 99.0},
+            "USD000UTSTOM": {5: 90.0, 10: 91.0},
+        }
+
+        def history(ticker, start_date=None, end_date=None):
+            self.assertEqual(start_date, datetime.date(2023, 12, 25))
+            return [
+                moexapi.History(
+                    date=datetime.date(2024, 1, day), low=close, high=close, open=close, close=close,
+                    mid_price=close, numtrades=1, volume=1, value=close,
+                )
+                for day, close in closes[ticker.secid].items()
+            ]
+
+        share = mock.Mock(secid="AAA", market=moexapi.Markets.SHARES, currency="RUB")
+        bond = mock.Mock(secid="BBB", market=moexapi.Markets.COMPANY_BONDS, currency="USD")
+        usd = mock.Mock(secid="USD000UTSTOM", market=moexapi.Markets.CURRENCY, currency="RUB")
+        schedule = mock.Mock(
+            outstanding_face=lambda dates: np.full(len(dates), 1000.0),
+            accrued_interest=lambda dates: (dates - np.datetime64("2024-01-01")).astype(float),
+        )
+        dates = [datetime.date(2024, 1, day) for day in [9, 8, 10]]
+        with (
+            mock.patch("moexapi.history.get_history", side_effect=history) as get_history,
+            mock.patch("moexapi.bonds.Bond", return_value=schedule),
+            mock.patch("moexapi.tickers.get_ticker", return_value=usd),
+        ):
+            nav = moexapi.value_portfolio(
+                [moexapi.Position(share, 10), moexapi.Position(bond, np.array([1.0, 2.0, 2.0]))],
+                dates,
+            )
+        self.assertEqual(get_history.call_count, 3)
+        self.assertEqual(list(nav.dates), list(np.array(sorted(dates), dtype="datetime64[D]")))
+        np.testing.assert_allclose(nav.prices[:, 0], [100.0, 100.0, 110.0])
+        np.testing.assert_allclose(nav.prices[:, 1], [np.nan, (980.0 + 8.0) * 90.0, (990.0 + 9.0) * 91.0])
+        np.testing.assert_allclose(nav.nav, [1000.0, 1000.0 + 2 * 988.0 * 90.0, 1100.0 + 2 * 999.0 * 91.0])
+
+
+    def test_record_date(self):
+        bond = _bond(_bondization(_RECORD_DATE_BONDIZATION))
+        ticker = mock.Mock(secid="AAA", market=moexapi.Markets.COMPANY_BONDS, currency="RUB")
+
+        def history(ticker, start_date=None, end_date=None):
+            return [
+                moexapi.History(
+                    date=datetime.date(2024, 6, 27), low=99.0, high=99.0, open=99.0, close=99.0,
+                    mid_price=99.0, numtrades=1, volume=1, value=99.0,
+                )
+            ]
+
+        dates = [datetime.date(2024, 6, day) for day in [27, 28, 29, 30]] + [datetime.date(2024, 7, 1)]
+        with (
+            mock.patch("moexapi.history.get_history", side_effect=history),
+            mock.patch("moexapi.bonds.Bond", return_value=bond),
+        ):
+            nav = moexapi.value_portfolio([moexapi.Position(ticker, 1)], dates)
+        # interest accrues till coupon date through record date
+        accrued = [50.0 * days / 182 for days in [178, 179, 180, 181]] + [0.0]
+        np.testing.assert_allclose(nav.nav, [990.0 + value for value in accrued])
+
+
 class Dividends(unittest.TestCase):
     def test_dividends(self):
         for ticker in ["CHMF", "MOEX", "SFIN"]:
@@ -181,6 +944,44 @@ class Dividends(unittest.TestCase):
 
 
 class Bonds(unittest.TestCase):
+    def test_cashflows(self):
+        response = {
+            "amortizations": {
+                "columns": ["amortdate", "value", "initialfacevalue"],
+                "data": [["2024-07-01", 500, 1000], ["2025-01-01", 500, 1000]],
+            },
+            "coupons": {
+                "columns": ["coupondate", "recorddate", "startdate", "value", "initialfacevalue"],
+                "data": [
+                    ["2024-07-01", None, "2024-01-01", 50.0, 1000],
+                    ["2025-01-01", None, "2024-07-01", None, 1000],
+                ],
+            },
+            "offers": {"columns": ["offerdate", "value"], "data": [["2024-10-01", 1000]]},
+        }
+
+        api_call = mock.Mock(side_effect=_bondization(response))
+        bond = _bond(api_call)
+        self.assertEqual(api_call.call_count, 5)
+        self.assertEqual(bond.expiration_date, datetime.date(2025, 1, 1))
+        self.assertEqual(bond.next_coupon(datetime.date(2024, 7, 2)).date, datetime.date(2025, 1, 1))
+        self.assertEqual(bond.next_offer_date(datetime.date(2024, 7, 2)), datetime.date(2024, 10, 1))
+        self.assertIsNone(bond.next_offer(datetime.date(2024, 10, 2)))
+        self.assertEqual(bond.outstanding_face(datetime.date(2024, 6, 30)), 1000.0)
+        self.assertEqual(bond.outstanding_face(datetime.date(2024, 7, 1)), 500.0)
+        self.assertEqual(
+            list(bond.outstanding_face([datetime.date(2024, 1, 1), datetime.date(2025, 1, 1)])),
+            [1000.0, 0.0],
+        )
+        self.assertAlmostEqual(bond.accrued_interest(datetime.date(2024, 4, 1)), 50.0 * 91 / 182)
+        self.assertIsNone(bond.accrued_interest(datetime.date(2024, 8, 1)))
+        self.assertEqual(bond.accrued_interest(datetime.date(2025, 2, 1)), 0.0)
+        cashflows = bond.cashflows_between(datetime.date(2024, 1, 1), datetime.date(2025, 1, 1))
+        self.assertEqual(
+            [(item.date, item.coupon, item.amortization) for item in cashflows],
+            [(datetime.date(2024, 7, 1), 50.0, 500.0), (datetime.date(2025, 1, 1), None, 500.0)],
+        )
+
     def test_bonds(self):
         bond = moexapi.Bond(moexapi.get_ticker("ОФЗ26238", market=moexapi.Markets.BONDS))
         self.assertEqual(bond.issue_date, datetime.date(2021, 6, 16))
@@ -195,6 +996,41 @@ class Bonds(unittest.TestCase):
         moexapi.Bond(moexapi.get_ticker(secid='SU52002RMFS1', market=moexapi.Markets.BONDS))
         moexapi.Bond(moexapi.get_ticker(secid='SU26218RMFS6', market=moexapi.Markets.BONDS))
 
+    def test_bond_universe(self):
+        response = {
+            "securities": {
+                "columns": ["SECID", "BOARDID", "FACEUNIT", "COUPONPERCENT", "MATDATE", "OFFERDATE", "PREVPRICE"],
+                "data": [
+                    ["AAA", "TQCB", "SUR", 12.0, "2026-01-01", None, 99.0],
+                    ["BBB", "TQCB", "USD", 7.0, "2030-01-01", "2027-01-01", 98.0],
+                    ["CCC", "TQCB", "SUR", 15.0, "2028-01-01", "0000-00-00", 97.0],
+                ],
+            },
+            "marketdata": {"columns": ["LAST", "YIELD"], "data": [[100.0, 14.0], [None, 8.0], [None, None]]},
+        }
+        with (
+            tempfile.TemporaryDirectory() as directory,
+            mock.patch("moexapi.screener.utils.json_api_call", return_value=response) as api_call,
+        ):
+            path = os.path.join(directory, "bonds.npz")
+            moexapi.BondUniverse.load(path, market=moexapi.Markets.COMPANY_BONDS)
+            universe = moexapi.BondUniverse.load(path, market=moexapi.Markets.COMPANY_BONDS)
+            self.assertEqual(api_call.call_count, 1)
+            # cache of other market or without requested details is reloaded
+            moexapi.BondUniverse.load(path, market=moexapi.Markets.FEDERAL_BONDS)
+            self.assertEqual(api_call.call_count, 2)
+            with mock.patch("moexapi.tickers.get_ticker_info_dict", return_value={"ISQUALIFIEDINVESTORS": "1"}):
+                detailed = moexapi.BondUniverse.load(path, market=moexapi.Markets.FEDERAL_BONDS, with_details=True)
+            self.assertEqual(api_call.call_count, 3)
+            self.assertTrue(detailed.is_qualified_investors.all())
+            moexapi.BondUniverse.load(path, market=moexapi.Markets.FEDERAL_BONDS)
+            self.assertEqual(api_call.call_count, 3)
+        self.assertEqual(list(universe.price), [100.0, 98.0, 97.0])
+        rub = universe.screen(currency="RUB", without_offers=True).sort("coupon_percent", descending=True)
+        self.assertEqual(list(rub.secid), ["CCC", "AAA"])
+        self.assertEqual(list(universe.screen(mat_date_till=datetime.date(2029, 1, 1), min_yield=10).secid), ["AAA"])
+        self.assertEqual(list(universe.sort("yield_percent", descending=True).secid), ["AAA", "BBB", "CCC"])
+
 
 class Splits(unittest.TestCase):
     def test_splits(self):
@@ -207,5 +1043,138 @@ class Splits(unittest.TestCase):
         self.assertAlmostEqual(split.mult, 40.0)
 
 
+class Utils(unittest.TestCase):
+    def test_record_replay(self):
+        url = "https://iss.moex.com/iss/test.json"
+        response = mock.Mock(status_code=200, text='{"value": 1}')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "archive.json.gz")
+            with (
+                mock.patch("requests.get", return_value=response),
+                moexapi.utils.recording(path),
+            ):
+                self.assertEqual(moexapi.utils.json_api_call(url), {"value": 1})
+            with (
+                mock.patch("requests.get", side_effect=AssertionError) as get,
+                mock.patch("moexapi.utils.time.sleep") as sleep,
+                moexapi.utils.replaying(path),
+            ):
+                self.assertEqual(moexapi.utils.json_api_call(url), {"value": 1})
+                with self.assertRaises(moexapi.utils.ReplayMiss):
+                    moexapi.utils.json_api_call(f"{url}?other")
+            get.assert_not_called()
+            sleep.assert_not_called()
+
+    def test_revalidation(self):
+        url = "https://iss.moex.com/iss/statistics/engines/stock/splits.json"
+        responses = [
+            mock.Mock(status_code=200, text='{"value": 1}', headers={"ETag": '"v1"'}),
+            mock.Mock(status_code=304, text="", headers={"ETag": '"v1"'}),
+        ]
+        with mock.patch("requests.get", side_effect=responses) as get:
+            self.assertEqual(moexapi.utils.json_api_call(url, use_cache=False), {"value": 1})
+            self.assertEqual(moexapi.utils.json_api_call(url, use_cache=False), {"value": 1})
+        self.assertIsNone(get.call_args_list[0].kwargs["headers"])
+        self.assertEqual(get.call_args_list[1].kwargs["headers"], {"If-None-Match": '"v1"'})
+        moexapi.utils._VALIDATED_TABLE.clear()
+
+    def test_redis_cache(self):
+        url = "https://iss.moex.com/iss/securities.json?start=0"
+        response = mock.Mock(status_code=200, text='{"securities": {"data": [["ЯЯЯ"]]}}', headers={})
+
+        def slow_get(*args, **kwargs):
+            time.sleep(0.05)
+            return response
+
+        with moexapi.LocalRedisServer() as server:
+            client = moexapi.RedisClient(port=server.port)
+            self.assertTrue(client.ping())
+            self.assertTrue(client.set("key", b"value", px=50, nx=True))
+            self.assertFalse(client.set("key", b"other", nx=True))
+            self.assertEqual(client.get("key"), b"value")
+            time.sleep(0.1)
+            self.assertIsNone(client.get("key"))
+            with self.assertRaises(moexapi.RedisError):
+                client.execute("INCR", "key")
+            cache = moexapi.RedisCache(client)
+            self.assertEqual(cache.ttl(url), 24 * 60 * 60)
+            self.assertEqual(cache.ttl("https://iss.moex.com/iss/engines/stock/markets/shares/securities/SBER.json"), 60)
+            changeover = "https://iss.moex.com/iss/history/engines/stock/markets/shares/securities/changeover.json"
+            self.assertEqual(cache.ttl(changeover), 24 * 60 * 60)
+            self.assertEqual(cache.ttl("https://iss.moex.com/iss/history/engines/stock/markets/shares/securities/SBER.json"), 60 * 60)
+            moexapi.utils.set_cache_backend(cache)
+            try:
+                with (
+                    mock.patch("requests.get", side_effect=slow_get) as get,
+                    concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor,
+                ):
+                    results = list(executor.map(lambda _: moexapi.utils.json_api_call(url), range(4)))
+                    moexapi.utils._CACHED_TABLE.clear()
+                    self.assertEqual(moexapi.utils.json_api_call(url), results[0])
+            finally:
+                moexapi.utils.set_cache_backend(None)
+            self.assertEqual(get.call_count, 1)
+            self.assertEqual(results, [{"securities": {"data": [["ЯЯЯ"]]}}] * 4)
+            self.assertEqual(json.loads(zlib.decompress(client.get(f"moexapi:{url}"))), results[0])
+            # lock taken by another node after expiry is not released
+            with cache.lock(url):
+                client.set(f"moexapi:lock:{url}", b"other")
+            self.assertEqual(client.get(f"moexapi:lock:{url}"), b"other")
+            with self.assertRaises(moexapi.RedisError):
+                client.eval("return 1", [], [])
+            client.set(f"moexapi:{url}", b"garbage")
+            self.assertIsNone(cache.get(url))
+            client.close()
+
+    def test_import(self):
+        code = "import sys; import moexapi; import moexapi.tickers; print(sorted({'bs4', 'numpy', 'requests'} & set(sys.modules)))"
+        output = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout
+        self.assertEqual(output.strip(), "[]")
+        self.assertIs(moexapi.Ticker, moexapi.tickers.Ticker)
+        self.assertIn("get_candles", dir(moexapi))
+
+    def test_iss_params(self):
+        self.assertEqual(
+            moexapi.utils.iss_params({"history": ["TRADEDATE", "CLOSE"], "history.cursor": None}),
+            "iss.meta=off&iss.only=history,history.cursor&history.columns=TRADEDATE,CLOSE",
+        )
+
+
+    def test_cli_export(self):
+        history = [
+            moexapi.History(date=datetime.date(2023, 12, 29), low=1, high=2, open=1, close=2, mid_price=1.5, numtrades=3, volume=4, value=6),
+            moexapi.History(date=datetime.date(2024, 1, 3), low=2, high=3, open=2, close=3, mid_price=2.5, numtrades=1, volume=1, value=None),
+        ]
+        ticker = mock.Mock(secid="AAA")
+        with (
+            tempfile.TemporaryDirectory() as directory,
+            mock.patch("moexapi.tickers.get_tickers", return_value=[ticker]),
+            mock.patch("moexapi.history.get_history", return_value=history) as get_history,
+        ):
+            argv = ["export", "--market", "shares", "--start", "2023-12-01", "--end", "2024-01-31", "--output", directory]
+            self.assertEqual(moexapi.cli.main(argv), 0)
+            self.assertEqual(sorted(os.listdir(os.path.join(directory, "AAA"))), ["2023.csv", "2024.csv", "_SUCCESS"])
+            with open(os.path.join(directory, "AAA", "2024.csv")) as f:
+                lines = f.read().splitlines()
+            self.assertEqual(lines[0], "date,low,high,open,close,mid_price,numtrades,volume,value")
+            self.assertEqual(lines[1], "2024-01-03,2.0,3.0,2.0,3.0,2.5,1,1.0,")
+            self.assertEqual(moexapi.cli.main(argv), 0)
+            self.assertEqual(get_history.call_count, 1)
+            # other range is exported again and replaces old partitions
+            history.pop(0)
+            argv[4] = "2024-01-01"
+            self.assertEqual(moexapi.cli.main(argv), 0)
+            self.assertEqual(get_history.call_count, 2)
+            self.assertEqual(sorted(os.listdir(os.path.join(directory, "AAA"))), ["2024.csv", "_SUCCESS"])
+            with open(os.path.join(directory, "AAA", "_SUCCESS")) as f:
+                self.assertEqual(json.load(f)["start_date"], "2024-01-01")
+
+
 if __name__ == '__main__':
     unittest.main()